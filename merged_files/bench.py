@@ -0,0 +1,1022 @@
+# Benchmarks for the hot paths in gameplay.py
+# Run from merged_files/:  python bench.py            (all benchmarks)
+#                          python bench.py map_classification
+
+from pathlib import Path
+import os
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+pygame.init()
+pygame.display.set_mode((1, 1))
+
+import gameplay
+
+MAP_PATH = Path('Assets') / 'img' / 'map.png'
+
+BENCHMARKS = {}
+
+def benchmark(fn):
+    BENCHMARKS[fn.__name__] = fn
+    return fn
+
+def best_of(fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        dt = time.perf_counter() - t0
+        if best is None or dt < best:
+            best = dt
+    return best, result
+
+def load_map():
+    # Same preparation as gameplay.main: load, convert, scale x2
+    map_surface = pygame.image.load(str(MAP_PATH)).convert()
+    return pygame.transform.scale_by(map_surface, 2)
+
+def report(label, seconds, extra=''):
+    print(f'  {label:<28} {seconds * 1000:9.3f} ms  {extra}')
+
+# ---------------------- BENCHMARKS ------------------
+@benchmark
+def map_classification():
+    map_surface = load_map()
+    tile, threshold = gameplay.TILE, 8
+
+    t_loop, loop_tiles = best_of(lambda: gameplay.classify_tiles_loop(map_surface, tile, threshold))
+    report('get_at loop', t_loop, f'{len(loop_tiles)} blocked')
+
+    t_fast, fast_tiles = best_of(lambda: gameplay.classify_tiles(map_surface, tile, threshold))
+    backend = 'numpy' if gameplay.np is not None else 'bytes'
+    report(f'batched ({backend})', t_fast, f'{len(fast_tiles)} blocked, x{t_loop / t_fast:.1f}')
+    assert fast_tiles == loop_tiles
+
+    if gameplay.np is not None:
+        np_module, gameplay.np = gameplay.np, None
+        try:
+            t_bytes, byte_tiles = best_of(lambda: gameplay.classify_tiles(map_surface, tile, threshold))
+        finally:
+            gameplay.np = np_module
+        report('batched (bytes)', t_bytes, f'{len(byte_tiles)} blocked, x{t_loop / t_bytes:.1f}')
+        assert byte_tiles == loop_tiles
+
+@benchmark
+def wall_merging():
+    import random
+    map_surface = load_map()
+    rng = random.Random(1)
+    world_w, world_h = map_surface.get_size()
+    queries = [pygame.Rect(rng.randrange(world_w - 32), rng.randrange(world_h - 32), 24, 24)
+               for _ in range(5000)]
+
+    for merge in (False, True):
+        walls = gameplay.build_world_from_map(map_surface, gameplay.TILE, 8, merge_walls=merge)[5]
+        group = walls.group
+        t_grid, hits = best_of(lambda: sum(walls.collides(r) for r in queries))
+        t_scan, scan_hits = best_of(lambda: sum(any(r.colliderect(w.rect) for w in group) for r in queries[:200]), 3)
+        assert scan_hits == sum(walls.collides(r) for r in queries[:200])
+        label = 'merged' if merge else 'per tile'
+        print(f'  {label}: {len(walls)} walls, {sum(map(len, walls.buckets.values()))} bucket entries')
+        report('  WallGrid.collides x5000', t_grid, f'{hits} hits')
+        report('  linear scan x200', t_scan)
+
+@benchmark
+def occupancy_grid():
+    import random
+    map_surface = load_map()
+    tiles = gameplay.classify_tiles(map_surface, gameplay.TILE, 8)
+    grid_w, grid_h = map_surface.get_width() // gameplay.TILE, map_surface.get_height() // gameplay.TILE
+    grid = gameplay.OccupancyGrid(grid_w, grid_h, tiles)
+    assert grid == tiles
+
+    set_bytes = sys.getsizeof(tiles) + sum(sys.getsizeof(t) + sys.getsizeof(t[0]) for t in tiles)
+    grid_bytes = sys.getsizeof(grid.cells)
+    print(f'  memory: set of tuples ~{set_bytes // 1024} KB, OccupancyGrid {grid_bytes // 1024} KB')
+
+    rng = random.Random(2)
+    probes = [(rng.randrange(grid_w), rng.randrange(grid_h)) for _ in range(100000)]
+    indices = [ty * grid_w + tx for (tx, ty) in probes]
+    cells = grid.cells
+    t_set, hits = best_of(lambda: sum(1 for p in probes if p in tiles))
+    report('tuple in set x100k', t_set, f'{hits} hits')
+    t_grid, grid_hits = best_of(lambda: sum(1 for p in probes if p in grid))
+    report('tuple in grid x100k', t_grid)
+    t_cells, cell_hits = best_of(lambda: sum(1 for i in indices if cells[i]))
+    report('cells[index] x100k', t_cells)
+    assert hits == grid_hits == cell_hits
+
+def random_free_pairs(blocked, grid_w, grid_h, count, seed):
+    import random
+    rng = random.Random(seed)
+    free = [(tx, ty) for ty in range(grid_h) for tx in range(grid_w) if (tx, ty) not in blocked]
+    return [(rng.choice(free), rng.choice(free)) for _ in range(count)]
+
+@benchmark
+def astar():
+    map_surface = load_map()
+    _, _, grid_w, grid_h, blocked, _ = gameplay.build_world_from_map(map_surface, gameplay.TILE, 8)
+    pairs = random_free_pairs(blocked, grid_w, grid_h, 200, 3)
+
+    t_ref, ref_paths = best_of(lambda: [gameplay.astar_reference(a, b, blocked, grid_w, grid_h) for a, b in pairs], 3)
+    report('tuple/dict A* x200', t_ref)
+    # the solver itself, not astar(): that may answer repeats from path_cache
+    solver = gameplay.astar_solver(grid_w, grid_h)
+    t_new, new_paths = best_of(lambda: [solver.search(a, b, blocked) for a, b in pairs], 3)
+    report('GridAStar x200', t_new, f'x{t_ref / t_new:.1f}')
+
+    assert all(len(r) == len(p) for r, p in zip(ref_paths, new_paths))
+    same = sum(r == p for r, p in zip(ref_paths, new_paths))
+    print(f'  equal lengths for all pairs, identical tile sequences for {same}/{len(pairs)}')
+
+@benchmark
+def sliced_astar():
+    map_surface = load_map()
+    _, _, grid_w, grid_h, blocked, walls = gameplay.build_world_from_map(map_surface, gameplay.TILE, 8)
+    pairs = random_free_pairs(blocked, grid_w, grid_h, 200, 6)
+    solver = gameplay.GridAStar(grid_w, grid_h)
+    whole = [solver.search(a, b, blocked) for a, b in pairs]
+
+    # resuming in slices must give exactly the same paths as one search() call
+    def sliced():
+        paths, slices = [], 0
+        for a, b in pairs:
+            search = solver.begin(a, b, blocked)
+            while not search.step(gameplay.SEARCH_SLICE):
+                slices += 1
+            paths.append(search.path)
+        return paths, slices
+    t_sliced, (paths, slices) = best_of(sliced, 3)
+    assert paths == whole
+    t_whole, _ = best_of(lambda: [solver.search(a, b, blocked) for a, b in pairs], 3)
+    report('search() x200', t_whole)
+    report(f'step({gameplay.SEARCH_SLICE}) x200', t_sliced, f'{slices} pauses, {len(solver.spare)} buffer set(s) pooled')
+
+    # a grid change while paused finishes the search as stale
+    search = solver.begin(*max(pairs, key=lambda p: len(whole[pairs.index(p)])), blocked)
+    search.step(10)
+    gameplay.Door(*DOORS[1]).close(blocked, walls)  # DOORS[0] sits on wall tiles only
+    assert search.step() and search.stale and search.path is None
+
+    # doors alone don't seal the shipped map, so wall in two rooms completely:
+    # searches into them stop before expanding anything
+    for d in DOORS[2:]:
+        gameplay.Door(*d).close(blocked, walls)
+    for name, x, y, w, h in ROOMS[:2]:
+        tx0, ty0, tx1, ty1 = gameplay.Room(name, x, y, w, h, [], []).tile_bounds()
+        for tx in range(tx0, tx1):
+            blocked.add((tx, ty0))
+            blocked.add((tx, ty1 - 1))
+        for ty in range(ty0, ty1):
+            blocked.add((tx0, ty))
+            blocked.add((tx1 - 1, ty))
+    pairs = random_free_pairs(blocked, grid_w, grid_h, 200, 7)
+    early = 0
+    for a, b in pairs:
+        search = solver.begin(a, b, blocked)
+        search.step()
+        early += search.early_out
+        assert bool(search.path) == bool(gameplay.astar_reference(a, b, blocked, grid_w, grid_h)), (a, b)
+        if search.early_out:
+            assert search.expanded == 0
+    print(f'  sealed rooms: {blocked.components.count} components, {early}/{len(pairs)} pairs early-out')
+
+@benchmark
+def path_cache():
+    import random
+    map_surface = load_map()
+    _, _, grid_w, grid_h, blocked, walls = gameplay.build_world_from_map(map_surface, gameplay.TILE, 8)
+    cache = gameplay.path_cache
+    use = gameplay.USE_PATH_CACHE
+    gameplay.USE_PATH_CACHE = True
+    try:
+        # a repeated query hits, a door toggle (blocked.add/discard) makes the next one miss
+        cache.clear()
+        a, b = next((a, b) for a, b in random_free_pairs(blocked, grid_w, grid_h, 50, 12)
+                    if gameplay.GridAStar(grid_w, grid_h).search(a, b, blocked))
+        first = gameplay.astar(a, b, blocked, grid_w, grid_h)
+        assert gameplay.astar(a, b, blocked, grid_w, grid_h) == first and cache.hits == 1
+        door = gameplay.Door(*DOORS[1])
+        door.close(blocked, walls)
+        gameplay.astar(a, b, blocked, grid_w, grid_h)
+        assert cache.misses == 2 and cache.hits == 1
+        door.open(blocked, walls)
+        assert gameplay.astar(a, b, blocked, grid_w, grid_h) == first and cache.misses == 3
+
+        # chase workload: the player walks a path, every enemy asks for a path to it
+        # each 15 frames and steps one tile along the answer (what request_path sees)
+        rng = random.Random(11)
+        free = [(tx, ty) for ty in range(grid_h) for tx in range(grid_w) if (tx, ty) not in blocked]
+        route = [a] + first
+        near = [t for t in free if abs(t[0] - a[0]) + abs(t[1] - a[1]) < 25]
+        enemies = [rng.choice(near) for _ in range(8)]
+        cache.clear()
+        for frame in range(0, 15 * 60, 15):
+            player = route[min(frame // 8, len(route) - 1)]  # a tile every 8 frames
+            for n, tile in enumerate(enemies):
+                path = gameplay.astar(tile, player, blocked, grid_w, grid_h)
+                if path:
+                    enemies[n] = path[0]
+        stats = cache.stats()
+        print(f"  chase, 8 enemies x60 requests: {stats['hits']} hits / {stats['misses']} misses "
+              f"(hit rate {stats['hit_rate']:.0%}), so USE_PATH_CACHE stays off by default")
+    finally:
+        gameplay.USE_PATH_CACHE = use
+        cache.clear()
+
+@benchmark
+def flow_field():
+    map_surface = load_map()
+    _, _, grid_w, grid_h, blocked, walls = gameplay.build_world_from_map(map_surface, gameplay.TILE, 8)
+    field = gameplay.FlowField(grid_w, grid_h)
+    pairs = random_free_pairs(blocked, grid_w, grid_h, 60, 8)
+    goal = pairs[0][1]
+    starts = [a for a, _ in pairs]
+    solver = gameplay.astar_solver(grid_w, grid_h)
+    t_build, _ = best_of(lambda: field.build(goal, blocked), 3)
+    t_astar, paths = best_of(lambda: [solver.search(a, goal, blocked) for a in starts], 1)
+    report('build', t_build, f'{len(field.reached)} tiles reached')
+    report(f'astar x{len(starts)}', t_astar, f'x{t_astar / t_build:.1f}')
+
+    # walking next_step from any tile is a shortest path, so exactly as long as astar's
+    def walk(tile):
+        steps = []
+        tile = field.next_step(tile)
+        while tile is not None:
+            steps.append(tile)
+            tile = field.next_step(tile)
+        return steps
+    def check(starts, paths):
+        for a, path in zip(starts, paths):
+            steps = walk(a)
+            assert len(steps) == len(path), (a, goal)
+            check_path(a, goal, steps, blocked)
+    check(starts, paths)
+
+    # same goal and grid: nothing to do; a door toggle rebuilds
+    assert not field.update(goal, blocked)
+    builds = field.builds
+    gameplay.Door(*DOORS[1]).close(blocked, walls)
+    assert field.update(goal, blocked) and field.builds == builds + 1
+    check(starts, [solver.search(a, goal, blocked) for a in starts])
+
+    # bounded to a room: nothing outside it gets a next step
+    tx0, ty0, tx1, ty1 = bounds = gameplay.Room(*ROOMS[0], [], []).tile_bounds()
+    inside = [(tx, ty) for ty in range(ty0, ty1) for tx in range(tx0, tx1) if (tx, ty) not in blocked]
+    t_room, _ = best_of(lambda: field.build(inside[len(inside) // 2], blocked, bounds), 3)
+    assert all(tx0 <= i % grid_w < tx1 and ty0 <= i // grid_w < ty1 for i in field.reached)
+    report(f'build in {ROOMS[0][0]}', t_room, f'{len(field.reached)} tiles reached')
+
+def same_partition(labels, fresh):
+    # incremental and full labels must group the free tiles identically
+    pairs = {}
+    for i in range(len(fresh.labels)):
+        a, b = labels.component(i), fresh.component(i)
+        assert (a == -1) == (b == -1), i
+        assert pairs.setdefault(a, b) == b, i
+    assert len(set(pairs.values())) == len(pairs)
+
+@benchmark
+def components():
+    import random
+    map_surface = load_map()
+    _, _, grid_w, grid_h, blocked, walls = gameplay.build_world_from_map(map_surface, gameplay.TILE, 8)
+    labels = blocked.components
+    t_full, _ = best_of(labels.relabel, 3)
+    report('full labelling', t_full, f'{labels.count} components')
+
+    # door toggles plus random wall cuts (which do split regions) against full relabels
+    rng = random.Random(8)
+    doors = [gameplay.Door(*d) for d in DOORS[1:]]
+    free = [(tx, ty) for ty in range(grid_h) for tx in range(grid_w) if (tx, ty) not in blocked]
+    times = []
+    for _ in range(30):
+        for door in doors:
+            if rng.random() < 0.3:
+                (door.close if door.opened else door.open)(blocked, walls)
+        for tile in rng.sample(free, 40):
+            (blocked.discard if tile in blocked else blocked.add)(tile)
+        t0 = time.perf_counter()
+        labels.refresh()
+        times.append(time.perf_counter() - t0)
+        fresh = gameplay.ComponentLabels(blocked)
+        same_partition(labels, fresh)
+    report('incremental refresh (avg)', sum(times) / len(times), f'worst {max(times) * 1000:.2f} ms, '
+                                                                  f'{labels.count} components, {labels.relabels} full relabel(s)')
+
+    # one door at a time, as in the game
+    times = []
+    for door in doors * 2:
+        (door.close if door.opened else door.open)(blocked, walls)
+        t0 = time.perf_counter()
+        labels.refresh()
+        times.append(time.perf_counter() - t0)
+    same_partition(labels, gameplay.ComponentLabels(blocked))
+    report('single door toggle (avg)', sum(times) / len(times), f'worst {max(times) * 1000:.2f} ms')
+
+    pairs = random_free_pairs(blocked, grid_w, grid_h, 2000, 9)
+    t_query, reachable = best_of(lambda: sum(labels.is_reachable(a, b) for a, b in pairs))
+    report('is_reachable x2000', t_query, f'{reachable} reachable')
+
+@benchmark
+def sprite_culling():
+    import random
+    rng = random.Random(10)
+    world_w, world_h = 4608, 4224
+    screen = pygame.Surface((gameplay.SCREEN_W, gameplay.SCREEN_H))
+    group = pygame.sprite.Group()
+    for _ in range(400):
+        sprite = pygame.sprite.Sprite()
+        sprite.image = pygame.Surface((48, 48))
+        sprite.image.fill((rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+        sprite.rect = sprite.image.get_rect(topleft=(rng.randrange(world_w - 48), rng.randrange(world_h - 48)))
+        group.add(sprite)
+    camera = gameplay.Camera(gameplay.SCREEN_W, gameplay.SCREEN_H, world_w, world_h)
+
+    def old_blit_group(surface, group):
+        # Camera.blit_group before culling
+        for sprite in sorted(group.sprites(), key=lambda s: s.rect.centery):
+            surface.blit(sprite.image, (sprite.rect.x - camera.offset.x, sprite.rect.y - camera.offset.y))
+
+    # camera sweeps across the world while every sprite moves a little each frame
+    frames = [pygame.Rect(x, (x * 7) % world_h, 32, 32) for x in range(0, world_w, 23)]
+
+    moves = [[(rng.choice((-2, 0, 2)), rng.choice((-2, 0, 2))) for _ in group] for _ in frames]
+
+    def run(draw, moving=True):
+        counts, spent = [], 0.0
+        for target, frame_moves in zip(frames, moves):
+            for sprite, move in zip(group, frame_moves if moving else ()):
+                sprite.rect.move_ip(move)
+            camera.center_on(target)
+            camera.reset_stats()
+            screen.fill((0, 0, 0))
+            t0 = time.perf_counter()
+            draw(screen, group)
+            spent += time.perf_counter() - t0
+            counts.append((camera.blits, camera.sorted))
+        return spent, counts
+
+    t_old = min(run(old_blit_group)[0] for _ in range(3))
+    t_new, counts = min(run(camera.blit_group) for _ in range(3))
+    report(f'sort + blit all x{len(frames)}', t_old, f'{len(group)} blits and sorts per frame')
+    report(f'culled, all moving x{len(frames)}', t_new, f'x{t_old / t_new:.1f}, blits per frame avg {sum(c[0] for c in counts) / len(counts):.1f} '
+                                                      f'max {max(c[0] for c in counts)}, sorted max {max(c[1] for c in counts)}')
+    t_static = min(run(camera.blit_group, moving=False)[0] for _ in range(3))
+    report(f'culled, static x{len(frames)}', t_static, f'x{t_old / t_static:.1f}')
+
+    # same pixels as drawing everything
+    for target in frames[::10]:
+        camera.center_on(target)
+        screen.fill((0, 0, 0))
+        old_blit_group(screen, group)
+        expected = pygame.image.tobytes(screen, 'RGB')
+        screen.fill((0, 0, 0))
+        camera.blit_group(screen, group)
+        assert pygame.image.tobytes(screen, 'RGB') == expected
+
+    # overlapping sprites on the same row keep group order, every frame
+    row = pygame.sprite.Group()
+    for i in range(40):
+        sprite = pygame.sprite.Sprite()
+        sprite.image = pygame.Surface((48, 48))
+        sprite.image.fill((i * 6, 255 - i * 6, 128))
+        sprite.rect = sprite.image.get_rect(topleft=(100 + i * 8, 100))
+        row.add(sprite)
+    camera.center_on(pygame.Rect(300, 120, 32, 32))
+    screen.fill((0, 0, 0))
+    old_blit_group(screen, row)
+    expected = pygame.image.tobytes(screen, 'RGB')
+    for _ in range(5):
+        screen.fill((0, 0, 0))
+        camera.blit_group(screen, row)
+        assert pygame.image.tobytes(screen, 'RGB') == expected
+
+@benchmark
+def map_rendering():
+    image = pygame.image.load(str(MAP_PATH)).convert()
+    full = pygame.transform.scale_by(image, gameplay.MAP_SCALE)
+    world_w, world_h = full.get_size()
+    screen = pygame.Surface((gameplay.SCREEN_W, gameplay.SCREEN_H))
+    camera = gameplay.Camera(gameplay.SCREEN_W, gameplay.SCREEN_H, world_w, world_h)
+    # a walk across the map plus some edges
+    targets = [pygame.Rect(x, (x * 3) % world_h, 1, 1) for x in range(0, world_w, 13)]
+    targets += [pygame.Rect(0, 0, 1, 1), pygame.Rect(world_w, world_h, 1, 1), pygame.Rect(world_w, 0, 1, 1)]
+
+    def full_blit():
+        for target in targets:
+            camera.center_on(target)
+            screen.blit(full, (-camera.offset.x, -camera.offset.y))
+
+    chunks = gameplay.MapChunks(image)
+    def chunked():
+        drawn = []
+        for target in targets:
+            camera.center_on(target)
+            chunks.draw(screen, camera)
+            drawn.append(chunks.drawn)
+        return drawn
+
+    t_full, _ = best_of(full_blit, 3)
+    t_chunks, drawn = best_of(chunked, 3)
+    report(f'full map blit x{len(targets)}', t_full)
+    report(f'chunks x{len(targets)}', t_chunks, f'x{t_full / t_chunks:.1f}, {min(drawn)}-{max(drawn)} chunks per frame, '
+                                                f'{chunks.loads} loads, {chunks.evictions} evictions')
+    # walking around one room: every chunk is already loaded
+    all_targets, targets = targets, [pygame.Rect(900 + x, 1100 + (x * 5) % 400, 1, 1) for x in range(0, 400, 2)]
+    t_full, _ = best_of(full_blit, 3)
+    loads = chunks.loads
+    t_chunks, drawn = best_of(chunked, 3)
+    report(f'full map blit x{len(targets)}', t_full)
+    report(f'warm chunks x{len(targets)}', t_chunks, f'x{t_full / t_chunks:.1f}, {chunks.loads - loads} loads')
+    targets = all_targets
+    chunk_bytes = sum(c.get_height() * c.get_pitch() for c in chunks.chunks.values())
+    print(f'  memory: full scaled map {full.get_height() * full.get_pitch() // 2**20} MB, '
+          f'source {image.get_height() * image.get_pitch() // 2**20} MB + {len(chunks.chunks)} chunks {chunk_bytes // 2**20} MB')
+
+    for target in targets[::15]:
+        camera.center_on(target)
+        screen.blit(full, (-camera.offset.x, -camera.offset.y))
+        expected = pygame.image.tobytes(screen, 'RGB')
+        screen.fill((0, 0, 0))
+        chunks.draw(screen, camera)
+        assert pygame.image.tobytes(screen, 'RGB') == expected
+
+@benchmark
+def background_scrolling():
+    image = pygame.image.load(str(MAP_PATH)).convert()
+    chunks = gameplay.MapChunks(image)
+    world_w, world_h = chunks.get_size()
+    screen = pygame.Surface((gameplay.SCREEN_W, gameplay.SCREEN_H)).convert()
+    camera = gameplay.Camera(gameplay.SCREEN_W, gameplay.SCREEN_H, world_w, world_h)
+    # player-speed walk (4 px, diagonals), pauses and one teleport
+    targets, x, y = [], 1500, 1500
+    for i in range(600):
+        if i % 100 < 20:
+            pass
+        elif i % 100 < 60:
+            x += 4
+        else:
+            x, y = x - 4, y + 4
+        if i == 300:
+            x, y = 3000, 600
+        targets.append(pygame.Rect(x, y, 1, 1))
+
+    def redraw():
+        for target in targets:
+            camera.center_on(target)
+            screen.fill((0, 0, 0))
+            chunks.draw(screen, camera)
+
+    background = gameplay.ScrollingBackground(chunks, screen.get_size())
+    def scrolled():
+        painted = 0
+        background.invalidate()
+        for target in targets:
+            camera.center_on(target)
+            background.draw(screen, camera)
+            painted += background.repainted
+        return painted
+
+    redraw()  # load the chunks outside the timing
+    t_full, _ = best_of(redraw, 3)
+    t_scroll, painted = best_of(scrolled, 3)
+    area = gameplay.SCREEN_W * gameplay.SCREEN_H
+    report(f'fill + chunks x{len(targets)}', t_full, f'{area * len(targets) // 1000} kpx from the map')
+    report(f'scroll buffer x{len(targets)}', t_scroll, f'x{t_full / t_scroll:.1f}, {painted // 1000} kpx from the map')
+
+    background.invalidate()
+    for target in targets:
+        camera.center_on(target)
+        background.draw(screen, camera)
+        got = pygame.image.tobytes(screen, 'RGB')
+        screen.fill((0, 0, 0))
+        chunks.draw(screen, camera)
+        assert got == pygame.image.tobytes(screen, 'RGB')
+
+ENEMY_TYPES = ('FastEnemy', 'Tank', 'charger', 'RangedEnemy', 'vampireLord', 'Boss')
+
+@benchmark
+def dirty_rects():
+    # which display calls present() makes, recorded instead of drawn
+    calls = []
+    flip, update = pygame.display.flip, pygame.display.update
+    pygame.display.flip = lambda: calls.append('flip')
+    pygame.display.update = lambda rects: calls.append(list(rects))
+    try:
+        dirty = gameplay.DirtyRects()
+        a, b = pygame.Rect(10, 10, 20, 20), pygame.Rect(50, 50, 8, 8)
+        dirty.present()                       # first frame: everything is new
+        dirty.add(a)
+        dirty.add(b)
+        dirty.add(pygame.Rect(5, 5, 0, 0))    # nothing drawn, nothing to update
+        dirty.present()
+        dirty.add(b)
+        dirty.present()                       # erase a and b where they were, draw b
+        dirty.mark_full()                     # camera scrolled
+        dirty.add(a)
+        dirty.present()
+        dirty.extend([pygame.Rect(i, 0, 1, 1) for i in range(dirty.max_rects)])
+        dirty.present()                       # too many rects for one update
+        off = gameplay.DirtyRects(enabled=False)
+        off.add(a)
+        off.present()
+        off.add(a)
+        off.present()
+    finally:
+        pygame.display.flip, pygame.display.update = flip, update
+    assert calls == ['flip', [a, b], [a, b, b], 'flip', 'flip', 'flip', 'flip'], calls
+    assert (dirty.flips, dirty.updates) == (3, 2) and dirty.rects == []
+    print(f'  {dirty.updates} partial updates, {dirty.flips} full flips, {off.flips} flips with DIRTY_RECTS off')
+
+@benchmark
+def enemy_images():
+    enemies = [getattr(gameplay, name)(100 + i, 100) for i in range(20) for name in ENEMY_TYPES]
+    for i, e in enumerate(enemies):
+        e.invul = i % 3 * 6  # a third of them flashing for a while
+    frames = 300
+
+    def old_update_images():
+        # the image part of Enemy.update before the shared variants
+        for _ in range(frames):
+            for e in enemies:
+                if e.invul > 0:
+                    e.image = e.base_image.copy()
+                    e.image.fill((255, 80, 80), special_flags=pygame.BLEND_RGBA_ADD)
+                else:
+                    e.image = e.base_image.copy()
+
+    def new_update_images():
+        for _ in range(frames):
+            for e in enemies:
+                e.image = e.flash_image if e.invul > 0 else e.base_image
+
+    t_old, _ = best_of(old_update_images, 3)
+    t_new, _ = best_of(new_update_images, 3)
+    report(f'copy + flash x{len(enemies)} x{frames}', t_old, f'{len(enemies) * frames} surfaces allocated')
+    report(f'shared variants x{len(enemies)} x{frames}', t_new, f'x{t_old / t_new:.0f}, '
+                                                               f'{len(gameplay.Enemy.sprite_variants)} variant pairs')
+    for e in enemies:
+        flashed = e.base_image.copy()
+        flashed.fill((255, 80, 80), special_flags=pygame.BLEND_RGBA_ADD)
+        assert pygame.image.tobytes(flashed, 'RGBA') == pygame.image.tobytes(e.flash_image, 'RGBA')
+
+@benchmark
+def sprite_assets():
+    def construct():
+        # what a room spawn plus a vampire's bats costs in constructors
+        return [getattr(gameplay, name)(100, 100) for name in ENEMY_TYPES for _ in range(10)]
+
+    def uncached():
+        # Enemy.set_sprite before the registry: load, cut and scale per instance
+        for name in ENEMY_TYPES:
+            for _ in range(10):
+                path, rect, scale = getattr(gameplay, name).SPRITE
+                pygame.transform.scale_by(gameplay.SpriteSheet(path).get_frame(*rect), scale)
+
+    t_old, _ = best_of(uncached, 3)
+    gameplay.Enemy.sprite_variants.clear()
+    gameplay.assets = registry = gameplay.AssetRegistry()
+    t0 = time.perf_counter()
+    gameplay.preload_enemy_sprites(release_sheets=False)
+    t_preload = time.perf_counter() - t0
+    rows = registry.memory_report()
+    registry.release_sheets()
+    t_new, enemies = best_of(construct, 3)
+    report(f'load per instance x{len(enemies)}', t_old)
+    report('preload', t_preload, f'{registry.disk_loads} disk loads')
+    report(f'constructors x{len(enemies)}', t_new, f'x{t_old / t_new:.0f}, {registry.disk_loads} disk loads total')
+    for name, (w, h), size in rows:
+        print(f'    {size / 1024:9.1f} KB  {w}x{h}  {name}')
+    print(f'  after release_sheets: {sum(r[2] for r in registry.memory_report()) / 1024:.1f} KB')
+    assert all(e.base_image is type(e).sprite_images(*type(e).SPRITE)[0] for e in enemies)
+
+@benchmark
+def sprite_atlas():
+    specs = gameplay.atlas_specs()
+
+    def startup(use_atlas):
+        registry = gameplay.AssetRegistry()
+        if use_atlas:
+            assert registry.load_atlas(), 'run build_atlas.py first'
+        registry.preload(specs)
+        return registry
+
+    t_sheets, sheets = best_of(lambda: startup(False), 3)
+    t_atlas, atlas = best_of(lambda: startup(True), 3)
+    peak = sum(r[2] for r in sheets.memory_report())
+    sheets.release_sheets()
+    resident = sum(r[2] for r in sheets.memory_report())
+    report(f'decode sheets, {len(specs)} frames', t_sheets, f'{sheets.disk_loads} PNGs, {peak / 2**20:.1f} MB decoded, '
+                                                           f'{resident / 1024:.0f} KB kept')
+    report('decode atlas', t_atlas, f'x{t_sheets / t_atlas:.0f}, {atlas.disk_loads} PNG, '
+                                   f'{sum(r[2] for r in atlas.memory_report()) / 1024:.0f} KB kept')
+    for spec in specs:
+        a, b = sheets.get(*spec), atlas.get(*spec)
+        assert b.get_parent() is atlas.atlas.sheet
+        assert pygame.image.tobytes(a, 'RGBA') == pygame.image.tobytes(b, 'RGBA'), spec
+
+@benchmark
+def sword_rotation():
+    import random
+    rng = random.Random(11)
+    sword = pygame.transform.scale_by(pygame.image.load('Assets\\img\\Sword.png').convert_alpha(), 0.1)
+    angles = [rng.uniform(-270, 90) for _ in range(2000)]  # atan2 range minus the 90 degree offset
+    centers = [(rng.uniform(0, 1000), rng.uniform(0, 600)) for _ in angles]
+    screen = pygame.Surface((gameplay.SCREEN_W, gameplay.SCREEN_H)).convert()
+
+    def rotate_each_frame():
+        for angle, center in zip(angles, centers):
+            image = pygame.transform.rotate(sword, angle)
+            screen.blit(image, image.get_rect(center=center))
+
+    t_rotate, _ = best_of(rotate_each_frame, 3)
+    report(f'transform.rotate x{len(angles)}', t_rotate)
+    for steps in (32, 64, 128):
+        t0 = time.perf_counter()
+        cache = gameplay.RotationCache(sword, steps)
+        t_build = time.perf_counter() - t0
+
+        def lookup():
+            for angle, center in zip(angles, centers):
+                image, rect = cache.rect(angle, center)
+                screen.blit(image, rect)
+        t_lookup, _ = best_of(lookup, 3)
+
+        # quality: alpha difference against the exact rotation, both centered on the same point
+        diffs = []
+        for angle in angles[:200]:
+            exact = pygame.transform.rotate(sword, angle)
+            near, _ = cache.get(angle)
+            w, h = max(exact.get_width(), near.get_width()), max(exact.get_height(), near.get_height())
+            a, b = pygame.Surface((w, h), pygame.SRCALPHA), pygame.Surface((w, h), pygame.SRCALPHA)
+            a.blit(exact, exact.get_rect(center=(w // 2, h // 2)))
+            b.blit(near, near.get_rect(center=(w // 2, h // 2)))
+            pa, pb = pygame.image.tobytes(a, 'RGBA')[3::4], pygame.image.tobytes(b, 'RGBA')[3::4]
+            diffs.append(sum(abs(x - y) for x, y in zip(pa, pb)) / max(sum(pa), 1))
+        memory = sum(f.get_pitch() * f.get_height() for f in cache.frames)
+        report(f'{steps} angles x{len(angles)}', t_lookup,
+               f'x{t_rotate / t_lookup:.1f}, build {t_build * 1000:.1f} ms, {memory // 1024} KB, '
+               f'max error {180 / steps:.1f} deg, alpha diff {sum(diffs) / len(diffs) * 100:.1f}% avg')
+        # exact step angles give exactly transform.rotate's image and rect
+        for i in range(0, steps, 7):
+            angle = i * 360 / steps
+            image, rect = cache.rect(angle, (500, 300))
+            exact = pygame.transform.rotate(sword, angle)
+            assert rect == exact.get_rect(center=(500, 300))
+            assert pygame.image.tobytes(image, 'RGBA') == pygame.image.tobytes(exact, 'RGBA')
+
+@benchmark
+def text_rendering():
+    font_path = str(gameplay.FONT_PATH)
+    menu = [('Main Menu', 20), ('Start Game', 20), ('Options', 20), ('Credits', 20), ('Exit', 20), ('*', 15)]
+    frames = 300
+    white = (255, 255, 255)
+
+    def old_menu_frames():
+        # Game.draw_text before the cache: pygame.init + a new Font per string
+        for _ in range(frames):
+            for text, size in menu:
+                pygame.init()
+                pygame.font.Font(font_path, size).render(text, True, white)
+
+    def new_menu_frames():
+        for _ in range(frames):
+            for text, size in menu:
+                gameplay.text_cache.render(text, size, white)
+
+    hud_font = pygame.font.Font(font_path, 20)
+    values = [(str(i // 120), str(20 - i // 45)) for i in range(frames)]  # keys and hp change now and then
+
+    def old_hud_frames():
+        for keys, hp in values:
+            hud_font.render(keys, True, white)
+            hud_font.render(hp, True, white)
+
+    def new_hud_frames():
+        for keys, hp in values:
+            gameplay.text_cache.render(keys, 20, white)
+            gameplay.text_cache.render(hp, 20, white)
+
+    t_old, _ = best_of(old_menu_frames, 3)
+    t_new, _ = best_of(new_menu_frames, 3)
+    report(f'menu, Font per string x{frames}', t_old)
+    report(f'menu, cached x{frames}', t_new, f'x{t_old / t_new:.0f}')
+    cache = gameplay.text_cache
+    renders = cache.renders
+    t_old, _ = best_of(old_hud_frames, 3)
+    t_new, _ = best_of(new_hud_frames, 3)
+    report(f'HUD, render every frame x{frames}', t_old)
+    report(f'HUD, cached x{frames}', t_new, f'x{t_old / t_new:.0f}, {cache.renders - renders} renders '
+                                             f'for {len(set(k for k, _ in values) | set(h for _, h in values))} distinct strings')
+    for text, size in menu:
+        expected = pygame.font.Font(font_path, size).render(text, True, white)
+        assert pygame.image.tobytes(expected, 'RGBA') == pygame.image.tobytes(cache.render(text, size, white), 'RGBA')
+
+@benchmark
+def menu_idle():
+    import threading
+    from menu import MENU_FPS
+    from menu_game import Game
+
+    game = Game()
+    seconds = 1.0
+    presents = [0]
+    update = pygame.display.update
+
+    def counting_update(*args):
+        presents[0] += 1
+        return update(*args)
+
+    def idle(menu, keys=()):
+        # leave the menu alone for a second (apart from a few key presses), then back out
+        def user():
+            for key in keys:
+                time.sleep(seconds / (len(keys) + 1))
+                event = key if isinstance(key, pygame.event.EventType) else pygame.event.Event(pygame.KEYDOWN, key=key)
+                pygame.event.post(event)
+            time.sleep(seconds / (len(keys) + 1))
+            menu.run_display = False
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_BACKSPACE))
+
+        game.current_menu = menu
+        presents[0], redraws = 0, menu.redraws
+        thread = threading.Thread(target=user)
+        cpu, wall = time.process_time(), time.perf_counter()
+        thread.start()
+        menu.display_menu()
+        thread.join()
+        cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+        report(f'{type(menu).__name__}, {len(keys)} keys', cpu,
+               f'cpu in {wall:.2f} s, {presents[0]} presents, {menu.redraws - redraws} redraws')
+        return presents[0]
+
+    pygame.display.update = counting_update
+    try:
+        assert idle(game.credits) == 1
+        # uncovering the window presents again, without redrawing
+        assert idle(game.credits, [pygame.event.Event(pygame.WINDOWEXPOSED)]) == 2
+        assert idle(game.volume_menu, [pygame.K_d, pygame.K_d, pygame.K_q]) == 4
+        assert idle(game.options, [pygame.K_s]) == 2
+        frames = idle(game.main_menu)
+        assert frames <= seconds * MENU_FPS + 5
+        assert game.main_menu.redraws == 1  # only the logo moves
+    finally:
+        pygame.display.update = update
+        game.current_menu = game.main_menu
+
+@benchmark
+def logo_frames():
+    import tempfile
+    from menu import LogoFrames, LOGO_SHEET, LOGO_FRAME, LOGO_SIZE
+
+    def old_startup():
+        # MainMenu.__init__ before the cache
+        sheet = pygame.image.load(LOGO_SHEET).convert_alpha()
+        frames = []
+        for row in range(sheet.get_height() // LOGO_FRAME[1]):
+            for col in range(sheet.get_width() // LOGO_FRAME[0]):
+                frame = pygame.Surface(LOGO_FRAME, pygame.SRCALPHA)
+                frame.blit(sheet, (0, 0), (col * LOGO_FRAME[0], row * LOGO_FRAME[1], *LOGO_FRAME))
+                frames.append(pygame.transform.smoothscale(frame, LOGO_SIZE))
+        return frames
+
+    def timed(fn):
+        t0 = time.perf_counter()
+        result = fn()
+        return time.perf_counter() - t0, result
+
+    t_old, old = timed(old_startup)
+    report('sheet decode + scale', t_old, f'{len(old)} frames')
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = Path(tmp)
+        t_cold, _ = timed(lambda: LogoFrames(lazy=False, cache_dir=cache_dir))
+        report('first run, writes cache', t_cold, f'{os.path.getsize(next(cache_dir.iterdir())) >> 20} MB on disk')
+        t_eager, eager = best_of(lambda: LogoFrames(lazy=False, cache_dir=cache_dir), 3)
+        report('cached, all frames', t_eager, f'x{t_old / t_eager:.0f}, {eager.memory() >> 20} MB held')
+        t_lazy, lazy = best_of(lambda: LogoFrames(cache_dir=cache_dir), 3)
+        report('cached, lazy open', t_lazy, f'x{t_old / t_lazy:.0f}')
+        t_cycle, _ = timed(lambda: [lazy[i] for i in range(len(lazy))])
+        report('lazy, one pass over frames', t_cycle,
+               f'{t_cycle / len(lazy) * 1000:.2f} ms/frame, {lazy.memory() >> 20} MB held (ring {len(lazy.ring)})')
+        for frames in (eager, lazy):
+            assert len(frames) == len(old)
+            for i, frame in enumerate(old):
+                assert pygame.image.tobytes(frames[i], 'RGBA') == pygame.image.tobytes(frame, 'RGBA'), i
+        lazy.close()
+
+        # first run in lazy mode: startup only hashes the sheet, frames appear when the build is done
+        next(cache_dir.iterdir()).unlink()
+        t_start, building = timed(lambda: LogoFrames(cache_dir=cache_dir))
+        assert len(building) == 0 or building.builder is None
+        building.builder.join()
+        report('first run, lazy start', t_start, f'{len(building)} frames after the background build')
+        building.close()
+
+@benchmark
+def sound_bank():
+    import sound
+
+    entries = sound.sound_bank.entries
+    t_old, _ = best_of(lambda: [pygame.mixer.Sound(path) for path, *_ in entries.values()], 3)
+    report(f'decode all {len(entries)} at import', t_old)
+
+    bank = sound.SoundBank()
+    for name, (path, volume, category) in entries.items():
+        bank.register(name, path, volume, category)
+    t0 = time.perf_counter()
+    thread = bank.warm_up(sound.GAMEPLAY_SOUNDS)
+    t_start = time.perf_counter() - t0
+    thread.join()
+    t_warm = time.perf_counter() - t0
+    report('warm_up, returns after', t_start, f'{t_warm * 1000:.1f} ms in the background, '
+                                              f'{bank.bytes >> 10} KB for {len(bank.sounds)} sounds')
+    t_hit, _ = best_of(lambda: [bank.get(name) for name in sound.GAMEPLAY_SOUNDS * 250], 3)
+    report('get() x1000, decoded', t_hit)
+
+    # everything once: the budget holds apart from what is still playing
+    playing = bank.get('zwaard').play(-1)
+    total = sum(bank.sound_bytes(pygame.mixer.Sound(path)) for path, *_ in entries.values())
+    for name in entries:
+        bank.get(name)
+    stats = bank.stats()
+    print(f"  all sounds once: {stats['bytes'] >> 10} KB held of {total >> 10} KB, "
+          f"budget {stats['budget'] >> 10} KB, {stats['evictions']} evictions")
+    assert stats['bytes'] <= stats['budget'] + bank.sounds['zwaard'][1]
+    assert 'zwaard' in bank.sounds  # playing, never dropped
+    playing.stop()
+    assert abs(sound.sfx_zwaard.get_volume() - entries['zwaard'][1]) < 0.01
+
+@benchmark
+def voice_pool():
+    import sound
+
+    bank = sound.sound_bank
+    bank.warm_up(background=False)
+    pool = sound.VoicePool(bank)
+
+    # one swing that lands on three enemies, the old way: a fixed channel per effect,
+    # skipped while busy
+    punch_channel = pool.channels[3]
+    old_played = 0
+    for _ in range(3):
+        if not punch_channel.get_busy():
+            punch_channel.play(bank.get('punch'))
+            old_played += 1
+    punch_channel.stop()
+    hits = [pool.play('punch') for _ in range(3)]
+    print(f'  3 hits in one swing: {old_played} heard before, {sum(c is not None for c in hits)} now')
+    assert all(hits) and len(set(hits)) == 3
+
+    # a fourth hit steals the oldest punch, footsteps never restart each other
+    pool.play('punch')
+    assert pool.stolen == 1 and pool.playing('hits') == 3
+    assert pool.play('voetstappen', sound.PRIORITY_LOW) and pool.play('voetstappen', sound.PRIORITY_LOW) is None
+
+    # every channel busy with low priority ambience: damage takes one over, more ambience is dropped
+    pool.stop()
+    for _ in pool.channels:
+        pool.play('sfeergeluid', sound.PRIORITY_LOW)
+    ambience = pool.limits.get('sfeergeluid', sound.DEFAULT_VOICE_LIMIT)[0]
+    assert pool.playing() == ambience
+    pool.limits = dict(pool.limits, sfeergeluid=(len(pool.channels), False))
+    for _ in range(len(pool.channels) - ambience):
+        pool.play('sfeergeluid', sound.PRIORITY_LOW)
+    assert pool.playing() == len(pool.channels)
+    stolen = pool.stolen
+    assert pool.play('damage', sound.PRIORITY_HIGH) is not None and pool.stolen == stolen + 1
+    assert pool.play('punch', sound.PRIORITY_LOW) is not None  # the low one gives way to equal priority
+    pool.play('damage', sound.PRIORITY_HIGH)
+    assert pool.voices.count(None) == 0
+
+    pool.stop()
+    names = ['voetstappen', 'punch', 'zwaard', 'damage'] * 250
+    t_play, _ = best_of(lambda: [pool.play(name) for name in names], 3)
+    report('play() x1000', t_play, f'{pool.stats()}')
+    pool.stop()
+
+# same rooms and doors as gameplay.main
+ROOMS = [("room1_fix", 477, 671, 880, 880), ("room4_fix", 3358, 2157, 675, 720), ("room5_fix", 3359, 333, 865, 818),
+         ("room2_fix", 863, 2829, 960, 723), ("room3_fix", 3551, 3500, 769, 629), ("boss", 1631, 45, 1538, 819)]
+DOORS = [(1346, 1442, 72, 149), (478, 668, 99, 91), (1629, 3643, 100, 88), (766, 3169, 95, 148),
+         (3459, 3743, 89, 146), (3458, 3939, 89, 152), (3453, 2158, 100, 73), (3839, 2160, 98, 50),
+         (3279, 1060, 79, 153), (2302, 919, 196, 53), (2302, 101, 196, 53)]
+
+def check_path(start, goal, path, blocked):
+    tile = start
+    for step in path:
+        assert abs(step[0] - tile[0]) + abs(step[1] - tile[1]) == 1, (start, goal, step)
+        assert step not in blocked, (start, goal, step)
+        tile = step
+    assert not path or tile == goal
+
+@benchmark
+def hierarchical_paths():
+    import random
+    map_surface = load_map()
+    _, _, grid_w, grid_h, blocked, walls = gameplay.build_world_from_map(map_surface, gameplay.TILE, 8)
+    rooms = [gameplay.Room(name, x, y, w, h, [], []) for (name, x, y, w, h) in ROOMS]
+    planner = gameplay.HierarchicalPlanner(grid_w, grid_h, rooms, gameplay.HPA_BLOCK)
+    t_build, _ = best_of(lambda: planner.rebuild(blocked), 3)
+    report('full rebuild', t_build, f'{len(planner.cluster_names)} clusters, {len(planner.inter)} portals')
+
+    # correctness against plain astar, on cross-cluster pairs only
+    pairs = [p for p in random_free_pairs(blocked, grid_w, grid_h, 400, 4) if not planner.same_cluster(*p)][:200]
+    t_astar, astar_paths = best_of(lambda: [gameplay.astar_reference(a, b, blocked, grid_w, grid_h) for a, b in pairs], 1)
+    t_hpa, hpa_paths = best_of(lambda: [planner.find_path(a, b, blocked) for a, b in pairs], 3)
+    ratios = []
+    for (a, b), ref, path in zip(pairs, astar_paths, hpa_paths):
+        assert bool(ref) == bool(path), (a, b)
+        check_path(a, b, path, blocked)
+        if ref:
+            ratios.append(len(path) / len(ref))
+    report(f'astar x{len(pairs)}', t_astar)
+    report(f'hpa x{len(pairs)}', t_hpa, f'x{t_astar / t_hpa:.1f}, path length +{(sum(ratios) / len(ratios) - 1) * 100:.1f}% avg, '
+                                         f'+{(max(ratios) - 1) * 100:.0f}% worst')
+
+    # door changes: incremental refresh must give the same graph as a full rebuild
+    rng = random.Random(5)
+    doors = [gameplay.Door(*d) for d in DOORS]
+    for _ in range(5):
+        for door in doors:
+            if rng.random() < 0.5:
+                door.close(blocked, walls)
+            else:
+                door.open(blocked, walls)
+        t0 = time.perf_counter()
+        planner.refresh(blocked)
+        t_refresh = time.perf_counter() - t0
+        fresh = gameplay.HierarchicalPlanner(grid_w, grid_h, rooms, gameplay.HPA_BLOCK)
+        fresh.rebuild(blocked)
+        assert fresh.borders == planner.borders and fresh.intra == planner.intra
+        for (a, b) in pairs[:40]:
+            path = planner.find_path(a, b, blocked)
+            assert bool(path) == bool(gameplay.astar(a, b, blocked, grid_w, grid_h)), (a, b)
+            check_path(a, b, path, blocked)
+    report('refresh after doors toggle', t_refresh)
+
+@benchmark
+def path_scheduler():
+    map_surface = load_map()
+    _, _, grid_w, grid_h, blocked, walls = gameplay.build_world_from_map(map_surface, gameplay.TILE, 8)
+    rooms = [gameplay.Room(name, x, y, w, h, [], []) for (name, x, y, w, h) in ROOMS]
+    planner = gameplay.HierarchicalPlanner(grid_w, grid_h, rooms, gameplay.HPA_BLOCK)
+    planner.refresh(blocked)
+    tile = gameplay.TILE
+    pairs = random_free_pairs(blocked, grid_w, grid_h, 400, 9)
+    player_tile = pairs[0][1]
+    player = pygame.Rect(0, 0, 20, 20)
+    player.center = (player_tile[0] * tile + tile // 2, player_tile[1] * tile + tile // 2)
+    # enemies in other clusters, all queued in the same frame
+    starts = [a for a, _ in pairs if not planner.same_cluster(a, player_tile)
+              and blocked.components.is_reachable(a, player_tile)][:12]
+    def spawn():
+        group = pygame.sprite.Group()
+        for tx, ty in starts:
+            group.add(gameplay.Enemy(tx * tile + tile // 2, ty * tile + tile // 2, 1, 1))
+        return group
+
+    # before: the planner search (and its catch-up after a door) ran whole inside request_path
+    door = gameplay.Door(*DOORS[1])
+    door.close(blocked, walls)
+    t0 = time.perf_counter()
+    for e in spawn():
+        e.request_path(player, blocked, grid_w, grid_h, planner)
+    report(f'synchronous x{len(starts)}', time.perf_counter() - t0, 'one frame, refresh after a door included')
+
+    door.open(blocked, walls)  # the planner is out of date again
+    scheduler = gameplay.PathScheduler(gameplay.PATH_BUDGET_MS)
+    enemies = spawn()
+    for e in enemies:
+        scheduler.submit(e)
+    frames = []
+    while scheduler.pending or scheduler.active:
+        t0 = time.perf_counter()
+        scheduler.run(player, blocked, grid_w, grid_h, planner)
+        frames.append(time.perf_counter() - t0)
+        assert len(frames) < 1000
+    budget = gameplay.PATH_BUDGET_MS / 1000
+    # the slice running at the deadline (SEARCH_SLICE tiles of A* or planner work) still finishes
+    assert max(frames) < 1.5 * budget, max(frames)
+    assert scheduler.served == len(starts) and planner.version == blocked.version and not planner.todo
+    for start, e in zip(starts, enemies.sprites()):
+        assert e.path, start
+        check_path(start, player_tile, e.path, blocked)
+    report(f'scheduled x{len(starts)}', sum(frames), f'{len(frames)} frames, worst {max(frames) * 1000:.2f} ms '
+                                                    f'(budget {gameplay.PATH_BUDGET_MS} ms), {scheduler.resumed} resumes')
+
+
+def main(names):
+    for name in names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            sys.exit(f'unknown benchmark {name!r}, choose from: {", ".join(BENCHMARKS)}')
+        print(name)
+        BENCHMARKS[name]()
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,47 @@
+# Build step: pre-scale every sprite frame in gameplay.atlas_specs() and pack them
+# into one image plus an index, so the game doesn't decode the full-size sheets.
+# Run from merged_files/ after changing any of those PNGs:  python build_atlas.py
+
+import json
+import os
+import sys
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+pygame.init()
+pygame.display.set_mode((1, 1))
+
+import gameplay
+
+
+def build(specs):
+    registry = gameplay.AssetRegistry()  # cuts from the sheets, never from an old atlas
+    frames = [registry.get(*spec) for spec in specs]
+    sizes = [f.get_size() for f in frames]
+    # narrowest-to-widest strip, keep the layout with the least area
+    widths = range(max(w for w, _ in sizes), sum(w for w, _ in sizes) + 1)
+    width = min(widths, key=lambda w: w * gameplay.pack_frames(sizes, w)[1])
+    spots, height = gameplay.pack_frames(sizes, width)
+    atlas = pygame.Surface((width, height), pygame.SRCALPHA)
+    atlas.fill((0, 0, 0, 0))
+    entries = []
+    for (path, frame_rect, scale), frame, (x, y) in zip(specs, frames, spots):
+        atlas.blit(frame, (x, y))
+        path = gameplay.asset_key(path)  # '/' so the index works off Windows too
+        entries.append({'path': path, 'frame': list(frame_rect) if frame_rect is not None else None,
+                        'scale': scale, 'rect': [x, y, frame.get_width(), frame.get_height()],
+                        'source_size': os.path.getsize(path)})
+    return atlas, entries
+
+def main():
+    specs = gameplay.atlas_specs()
+    atlas, entries = build(specs)
+    pygame.image.save(atlas, str(gameplay.ATLAS_IMG))
+    with open(gameplay.ATLAS_INDEX, 'w') as f:
+        json.dump({'frames': entries}, f, indent=1)
+    print(f'{len(entries)} frames -> {gameplay.ATLAS_IMG} ({atlas.get_width()}x{atlas.get_height()})')
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,5 @@
+from pathlib import Path
+
+# derived data (world grid, logo frames) survives between runs; shared by
+# gameplay and menu so the menu doesn't have to import all of gameplay
+CACHE_DIR = Path('.cache')
@@ -1,6 +1,6 @@
 
 # Patched game.py
-# - No numpy/surfarray dependency (uses Surface.get_at for map sampling)
+# - numpy is optional (map sampling falls back to PixelArray/bytes without it)
 # - Windows path warnings fixed (pathlib/forward slashes)
 # - Dynamic camera + AI preserved
 
@@ -9,15 +9,48 @@ import pygame
 import random
 import math
 import heapq
+import hashlib
+import json
+import os
+import struct
+import time
+from array import array
+from collections import OrderedDict, deque
+from collections.abc import MutableSet
 
 import sys
 
-from sound import sfx_zwaard, sfx_voetstappen, sfx_punch, sfx_damage, channel1, channel2, channel3, channel4
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from sound import sound_bank, voices, GAMEPLAY_SOUNDS, PRIORITY_LOW, PRIORITY_HIGH
+from cache import CACHE_DIR   # derived data (world grid) survives between runs
 
 # ---------------------- CONFIG ----------------------
 SCREEN_W, SCREEN_H = 1000, 600    # window size
 TILE = 32                        # tile size for pathfinding grid
 FPS = 60
+USE_FLOW_FIELD = True            # chasing enemies share one distance map to the player
+USE_PATH_CACHE = False           # reuse astar results for the same (start, goal, grid); off: 0 hits in play
+PATH_CACHE_SIZE = 256            # astar results kept per grid version (see path_cache.stats())
+USE_HPA = True                   # cross-cluster paths go through the room/portal graph
+HPA_BLOCK = 16                   # corridor tiles outside rooms are split into blocks of this size
+PATH_BUDGET_MS = 2.0             # time per frame the path scheduler may spend on request_path
+SEARCH_SLICE = 256               # A* expansions between budget checks for time-sliced searches
+CULL_CELL = 256                  # spatial hash cell size (px) for Camera.blit_group culling
+SHOW_DRAW_STATS = False          # overlay blit/sort/cull counts per frame
+MAP_SCALE = 2                    # map.png is pixel art, drawn at x2
+MAP_CHUNK = 512                  # map is drawn from MAP_CHUNK x MAP_CHUNK surfaces (screen px)
+MAP_CHUNK_CACHE = 32             # chunks kept in memory (~1 MB each), least recently drawn go first
+DIRTY_RECTS = True               # push only changed screen regions while the camera stands still
+ATLAS_IMG = Path('Assets') / 'img' / 'atlas.png'     # pre-scaled sprite frames, made by build_atlas.py
+ATLAS_INDEX = Path('Assets') / 'img' / 'atlas.json'  # (path, frame_rect, scale) -> rect in ATLAS_IMG
+HERO_SPRITE = ('Assets\img\Hero_basic_24x24.png', None, 2)
+SWORD_ANGLES = 64                # pre-rotated sword frames (360 / 64 = 5.6 degree steps)
+FONT_PATH = Path('Assets') / '8-BIT WONDER.TTF'
+TEXT_CACHE_SIZE = 128            # rendered text surfaces kept (menus + HUD), least recently used go first
 
 # Asset paths (relative to this script)
 ASSETS_DIR = Path('merged_files\Assets')
@@ -25,6 +58,68 @@ HERO_IMG = ASSETS_DIR / 'merged_files\Assets\Hero_basic_24x24.png'  # use your a
 MAP_IMG  = ASSETS_DIR / 'merged_files\Assets\map.png'          # pre-generated map image
 
 # ---------------------- CAMERA ----------------------
+class SpriteHash:
+    """Sprites bucketed by the CULL_CELL-sized world cells their rect overlaps.
+    sync() only moves a sprite to other buckets when its cell span changed,
+    query() returns the sprites in the cells a rect covers.
+    sync() still looks at every sprite once per frame (a span compare, sprites
+    don't report their moves); sorting and blitting scale with the visible set."""
+    def __init__(self, cell=CULL_CELL):
+        self.cell = cell
+        self.buckets = {}  # (cx, cy) -> set of sprites
+        self.spans = {}    # sprite -> (cx0, cy0, cx1, cy1)
+        self.order = {}    # sprite -> position in the group at the last sync
+
+    def _span(self, rect):
+        c = self.cell
+        return (rect.left // c, rect.top // c, (rect.right - 1) // c, (rect.bottom - 1) // c)
+
+    def _cells(self, span):
+        cx0, cy0, cx1, cy1 = span
+        return [(cx, cy) for cy in range(cy0, cy1 + 1) for cx in range(cx0, cx1 + 1)]
+
+    def _insert(self, sprite, span):
+        self.spans[sprite] = span
+        for key in self._cells(span):
+            self.buckets.setdefault(key, set()).add(sprite)
+
+    def _remove(self, sprite):
+        for key in self._cells(self.spans.pop(sprite)):
+            bucket = self.buckets[key]
+            bucket.discard(sprite)
+            if not bucket:
+                del self.buckets[key]
+
+    def sync(self, group):
+        spans, order, c = self.spans, self.order, self.cell
+        kept = added = 0
+        for n, sprite in enumerate(group):
+            order[sprite] = n
+            r = sprite.rect
+            span = (r.left // c, r.top // c, (r.right - 1) // c, (r.bottom - 1) // c)
+            old = spans.get(sprite)
+            if old is None:
+                self._insert(sprite, span)
+                added += 1
+                continue
+            kept += 1
+            if old != span:
+                self._remove(sprite)
+                self._insert(sprite, span)
+        if kept + added != len(spans):
+            # some sprites left the group (killed)
+            for sprite in [s for s in spans if s not in group]:
+                self._remove(sprite)
+                del order[sprite]
+
+    def query(self, rect):
+        found = set()
+        for key in self._cells(self._span(rect)):
+            bucket = self.buckets.get(key)
+            if bucket:
+                found |= bucket
+        return found
+
 class Camera:
     def __init__(self, screen_w, screen_h, world_w, world_h):
         self.offset = pygame.math.Vector2(0, 0)
@@ -34,6 +129,10 @@ class Camera:
         self.screen_h = screen_h
         self.world_w = world_w
         self.world_h = world_h
+        self.hashes = {}  # group -> SpriteHash, made on first blit_group
+        self.dirty = None  # DirtyRects that receives the rects blit_group draws
+        self.margin = 64  # images may stick out of their rect (right/down)
+        self.reset_stats()
 
     def center_on(self, target_rect):
         target_x = target_rect.centerx - self.half_w
@@ -45,10 +144,172 @@ class Camera:
     def to_world(self, screen_pos):
         return (screen_pos[0] + int(self.offset.x), screen_pos[1] + int(self.offset.y))
 
+    def view_rect(self):
+        return pygame.Rect(int(self.offset.x), int(self.offset.y), self.screen_w, self.screen_h)
+
+    def reset_stats(self):
+        # per-frame counters, call once before drawing
+        self.blits = 0    # sprites drawn
+        self.sorted = 0   # sprites that went through the depth sort
+        self.culled = 0   # sprites skipped as off-screen
+
     def blit_group(self, surface, group):
-        for sprite in sorted(group.sprites(), key=lambda s: s.rect.centery):
-            surface.blit(sprite.image, (sprite.rect.x - self.offset.x,
-                                        sprite.rect.y - self.offset.y))
+        """Draw the sprites of group that overlap the view, sorted by rect.centery
+        (group order on ties, like the stable sort over the whole group was)."""
+        grid = self.hashes.get(group)
+        if grid is None:
+            grid = self.hashes[group] = SpriteHash()
+        grid.sync(group)
+        view = self.view_rect()
+        m = self.margin
+        candidates = grid.query(pygame.Rect(view.x - m, view.y - m, view.w + m, view.h + m))
+        visible = [s for s in candidates if view.colliderect(s.rect.topleft, s.image.get_size())]
+        order = grid.order
+        visible.sort(key=lambda s: (s.rect.centery, order[s]))
+        ox, oy = self.offset.x, self.offset.y
+        drawn = surface.blits([(s.image, (s.rect.x - ox, s.rect.y - oy)) for s in visible], self.dirty is not None)
+        if self.dirty is not None:
+            self.dirty.extend(drawn)
+        self.blits += len(visible)
+        self.sorted += len(visible)
+        self.culled += len(group) - len(visible)
+
+# ---------------------- MAP RENDERING ---------------
+class MapChunks:
+    """The map as chunk x chunk surfaces in the display format, so a frame only
+    blits the few chunks under the camera instead of the whole map. A chunk is
+    cropped (and scaled) from the unscaled source the first time it is on
+    screen; at most max_chunks stay loaded, least recently drawn are dropped."""
+    def __init__(self, source, scale=MAP_SCALE, chunk=MAP_CHUNK, max_chunks=MAP_CHUNK_CACHE):
+        if chunk % scale:
+            raise ValueError(f'chunk size {chunk} is not a multiple of scale {scale}')
+        self.source = source
+        self.scale = scale
+        self.chunk = chunk
+        self.max_chunks = max_chunks
+        self.world_w = source.get_width() * scale
+        self.world_h = source.get_height() * scale
+        self.cols = -(-self.world_w // chunk)
+        self.rows = -(-self.world_h // chunk)
+        self.chunks = OrderedDict()  # (cx, cy) -> Surface
+        self.loads = 0
+        self.evictions = 0
+        self.drawn = 0  # chunks blitted by the last draw()
+
+    def get_size(self):
+        return (self.world_w, self.world_h)
+
+    def get_chunk(self, cx, cy):
+        surf = self.chunks.get((cx, cy))
+        if surf is not None:
+            self.chunks.move_to_end((cx, cy))
+            return surf
+        step = self.chunk // self.scale
+        area = pygame.Rect(cx * step, cy * step, step, step).clip(self.source.get_rect())
+        surf = self.source.subsurface(area)
+        if self.scale != 1:
+            surf = pygame.transform.scale_by(surf, self.scale)
+        surf = surf.convert()  # own copy in the display format, not a view of source
+        self.chunks[(cx, cy)] = surf
+        self.loads += 1
+        while len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+            self.evictions += 1
+        return surf
+
+    def draw(self, surface, camera):
+        self.draw_at(surface, int(camera.offset.x), int(camera.offset.y))
+
+    def draw_at(self, surface, ox, oy):
+        # map with world point (ox, oy) at the surface's top left, only inside its clip rect
+        c = self.chunk
+        clip = surface.get_clip()
+        cx0, cy0 = max((ox + clip.x) // c, 0), max((oy + clip.y) // c, 0)
+        cx1, cy1 = min((ox + clip.right - 1) // c, self.cols - 1), min((oy + clip.bottom - 1) // c, self.rows - 1)
+        blits = [(self.get_chunk(cx, cy), (cx * c - ox, cy * c - oy))
+                 for cy in range(cy0, cy1 + 1) for cx in range(cx0, cx1 + 1)]
+        surface.blits(blits, False)
+        self.drawn = len(blits)
+
+class ScrollingBackground:
+    """Screen-sized buffer holding last frame's map background. When the camera
+    moves, the buffer is scrolled by the delta and only the newly exposed strips
+    are painted from the map chunks, so the map work follows the motion instead
+    of the screen area. Also replaces the black screen.fill (outside the map stays black)."""
+    def __init__(self, chunks, size):
+        self.chunks = chunks
+        self.buffer = pygame.Surface(size).convert()
+        self.offset = None
+        self.repainted = 0  # pixels painted from the map last frame
+
+    def draw(self, surface, camera):
+        ox, oy = int(camera.offset.x), int(camera.offset.y)
+        w, h = self.buffer.get_size()
+        if self.offset is None:
+            strips = [pygame.Rect(0, 0, w, h)]
+        else:
+            dx, dy = ox - self.offset[0], oy - self.offset[1]
+            if abs(dx) >= w or abs(dy) >= h:
+                strips = [pygame.Rect(0, 0, w, h)]
+            else:
+                strips = []
+                if dx or dy:
+                    self.buffer.scroll(-dx, -dy)
+                if dx:
+                    strips.append(pygame.Rect(w - dx if dx > 0 else 0, 0, abs(dx), h))
+                if dy:
+                    strips.append(pygame.Rect(0, h - dy if dy > 0 else 0, w, abs(dy)))
+        self.offset = (ox, oy)
+        self.repainted = 0
+        for area in strips:
+            self.buffer.set_clip(area)
+            self.buffer.fill((0, 0, 0))
+            self.chunks.draw_at(self.buffer, ox, oy)
+            self.repainted += area.w * area.h
+        self.buffer.set_clip(None)
+        surface.blit(self.buffer, (0, 0))
+
+    def invalidate(self):
+        # repaint everything next frame (e.g. after the map image changed)
+        self.offset = None
+
+# ---------------------- DISPLAY UPDATES -------------
+class DirtyRects:
+    """Screen regions drawn this frame. present() passes them, together with last
+    frame's regions (where those sprites must be erased), to display.update()
+    instead of flipping the whole screen. Falls back to a full flip after
+    mark_full() (camera scrolled, pause menu) or when there are too many rects."""
+    def __init__(self, enabled=True, max_rects=64):
+        self.enabled = enabled
+        self.max_rects = max_rects
+        self.rects = []
+        self.previous = []
+        self.full = True
+        self.flips = 0
+        self.updates = 0
+
+    def add(self, rect):
+        if rect:
+            self.rects.append(pygame.Rect(rect))
+        return rect
+
+    def extend(self, rects):
+        self.rects.extend(r for r in rects if r)
+
+    def mark_full(self):
+        self.full = True
+
+    def present(self):
+        changed = self.previous + self.rects
+        if self.full or not self.enabled or len(changed) > self.max_rects:
+            pygame.display.flip()
+            self.flips += 1
+        else:
+            pygame.display.update(changed)
+            self.updates += 1
+        self.previous = self.rects
+        self.rects = []
+        self.full = False
 
 # ---------------------- UTILITIES -------------------
 def get_mouse_sword_hitbox(player_rect, dir_x, dir_y, angle_offset=0):
@@ -63,16 +324,17 @@ def get_mouse_sword_hitbox(player_rect, dir_x, dir_y, angle_offset=0):
     else:
         return pygame.Rect(cx - thickness // 2, cy - length // 2, thickness, length)
 
-def rect_collides_walls(rect, walls_group):
-    for w in walls_group:
-        if rect.colliderect(w.rect):
-            return True
-    return False
-
-def spawn_locations(free_tiles, amount, player):
+def spawn_locations(free_tiles, amount, player, blocked_tiles=None):
+    # with blocked_tiles, only tiles the player can walk to (not sealed off pockets)
     attempts = 0
     locations = 0
     free_tiles_list = list(free_tiles)
+    if blocked_tiles is not None:
+        player_tile = find_near_free((player.rect.centerx // TILE, player.rect.centery // TILE),
+                                     blocked_tiles, blocked_tiles.grid_w, blocked_tiles.grid_h)
+        if player_tile is not None:
+            reachable = blocked_tiles.components.is_reachable
+            free_tiles_list = [t for t in free_tiles_list if reachable(player_tile, t)] or free_tiles_list
     result = set()
     while locations < amount and attempts < 1000:
         attempts += 1
@@ -85,10 +347,381 @@ def spawn_locations(free_tiles, amount, player):
         locations += 1
     return list(result)
 
+# ---------------------- OCCUPANCY GRID --------------
+class OccupancyGrid(MutableSet):
+    """Blocked tiles as one byte per tile in a flat bytearray (index ty*grid_w+tx).
+    Still acts like the old set of (tx, ty) tuples (in, add, discard, iteration,
+    set difference), but hot loops can read .cells[index] directly."""
+    def __init__(self, grid_w, grid_h, tiles=()):
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        self.cells = bytearray(grid_w * grid_h)
+        self.count = 0
+        self.version = 0  # bumped on every change, so derived data knows when to rebuild
+        self._components = None
+        for tile in tiles:
+            self.add(tile)
+
+    @property
+    def components(self):
+        # walkable-region labels (ComponentLabels), built on first use
+        if self._components is None:
+            self._components = ComponentLabels(self)
+        return self._components
+
+    def index(self, tx, ty):
+        return ty * self.grid_w + tx
+
+    def in_bounds(self, tx, ty):
+        return 0 <= tx < self.grid_w and 0 <= ty < self.grid_h
+
+    def __contains__(self, tile):
+        tx, ty = tile
+        return 0 <= tx < self.grid_w and 0 <= ty < self.grid_h and self.cells[ty * self.grid_w + tx] != 0
+
+    def __iter__(self):
+        w = self.grid_w
+        cells = self.cells
+        i = cells.find(1)
+        while i != -1:
+            yield (i % w, i // w)
+            i = cells.find(1, i + 1)
+
+    def __len__(self):
+        return self.count
+
+    def add(self, tile):
+        tx, ty = tile
+        if not self.in_bounds(tx, ty):
+            raise ValueError(f'tile {tile} outside {self.grid_w}x{self.grid_h} grid')
+        i = ty * self.grid_w + tx
+        if not self.cells[i]:
+            self.cells[i] = 1
+            self.count += 1
+            self.version += 1
+
+    def discard(self, tile):
+        tx, ty = tile
+        if self.in_bounds(tx, ty):
+            i = ty * self.grid_w + tx
+            if self.cells[i]:
+                self.cells[i] = 0
+                self.count -= 1
+                self.version += 1
+
+    def copy(self):
+        other = OccupancyGrid(self.grid_w, self.grid_h)
+        other.cells[:] = self.cells
+        other.count = self.count
+        return other
+
+    @classmethod
+    def _from_iterable(cls, iterable):
+        # results of set operators are plain sets
+        return set(iterable)
+
+    def __rsub__(self, other):
+        # set - grid, e.g. Room.tiles - blocked_tiles
+        return {tile for tile in other if tile not in self}
+
+    def __repr__(self):
+        return f'OccupancyGrid({self.grid_w}x{self.grid_h}, {self.count} blocked)'
+
+def changed_cells(old, cells):
+    # indices where cells differs from the snapshot old (equal length), compared in chunks
+    changed = []
+    if old == cells:
+        return changed
+    chunk = 512
+    for base in range(0, len(cells), chunk):
+        if cells[base:base + chunk] != old[base:base + chunk]:
+            for i in range(base, min(base + chunk, len(cells))):
+                if cells[i] != old[i]:
+                    changed.append(i)
+    return changed
+
+def find_near_free(tile, blocked_tiles, grid_w, grid_h):
+    # the tile itself if walkable, else a free neighbour (8 directions), else None
+    cells = blocked_tiles.cells
+    tx, ty = tile
+    if not (0 <= tx < grid_w and 0 <= ty < grid_h) or not cells[ty * grid_w + tx]:
+        return tile
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            cx, cy = tx + dx, ty + dy
+            if 0 <= cx < grid_w and 0 <= cy < grid_h and not cells[cy * grid_w + cx]:
+                return (cx, cy)
+    return None
+
+# ---------------------- FLOW FIELD ------------------
+class FlowField:
+    """Breadth-first distance map toward one goal tile (the player).
+    Rebuilt once per goal / grid change; every chasing enemy then reads its
+    next tile from self.next in O(1) instead of running its own astar."""
+    def __init__(self, grid_w, grid_h):
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        self.dist = array('i', [-1]) * (grid_w * grid_h)
+        self.next = array('i', [-1]) * (grid_w * grid_h)
+        self.reached = []  # indices written by the last build, reset on the next one
+        self.goal = None
+        self.bounds = None
+        self.version = None
+        self.builds = 0
+
+    def update(self, goal, blocked_tiles, bounds=None):
+        """Rebuild if goal, bounds or the grid changed. bounds = (tx0, ty0, tx1, ty1), exclusive end."""
+        goal = find_near_free(goal, blocked_tiles, self.grid_w, self.grid_h)
+        if bounds is not None and goal is not None:
+            tx0, ty0, tx1, ty1 = bounds
+            if not (tx0 <= goal[0] < tx1 and ty0 <= goal[1] < ty1):
+                bounds = None
+        if goal == self.goal and bounds == self.bounds and blocked_tiles.version == self.version:
+            return False
+        self.build(goal, blocked_tiles, bounds)
+        return True
+
+    def build(self, goal, blocked_tiles, bounds=None):
+        w, h = self.grid_w, self.grid_h
+        dist, nxt = self.dist, self.next
+        for i in self.reached:
+            dist[i] = -1
+            nxt[i] = -1
+        self.reached = reached = []
+        self.goal, self.bounds, self.version = goal, bounds, blocked_tiles.version
+        self.builds += 1
+        if goal is None:
+            return
+        tx0, ty0, tx1, ty1 = bounds if bounds is not None else (0, 0, w, h)
+        tx0, ty0, tx1, ty1 = max(tx0, 0), max(ty0, 0), min(tx1, w), min(ty1, h)
+        gx, gy = goal
+        if not (tx0 <= gx < tx1 and ty0 <= gy < ty1):
+            return
+        cells = blocked_tiles.cells
+        start = gy * w + gx
+        dist[start] = 0
+        reached.append(start)
+        queue = deque([start])
+        while queue:
+            i = queue.popleft()
+            x, y = i % w, i // w
+            d = dist[i] + 1
+            for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if nx < tx0 or ny < ty0 or nx >= tx1 or ny >= ty1:
+                    continue
+                n = ny * w + nx
+                if cells[n] or dist[n] != -1:
+                    continue
+                dist[n] = d
+                nxt[n] = i  # one step closer to the goal
+                reached.append(n)
+                queue.append(n)
+
+    def next_step(self, tile):
+        tx, ty = tile
+        if not (0 <= tx < self.grid_w and 0 <= ty < self.grid_h):
+            return None
+        n = self.next[ty * self.grid_w + tx]
+        if n < 0:
+            return None
+        return (n % self.grid_w, n // self.grid_w)
+
+# ---------------------- CONNECTED COMPONENTS --------
+class ComponentLabels:
+    """Which walkable region every tile of one OccupancyGrid belongs to.
+    Tiles whose labels have different roots can never reach each other, so
+    pathfinding and spawning can skip hopeless work with is_reachable().
+    Kept up to date incrementally from the tiles that changed since the last
+    refresh: opened tiles merge regions (union-find on labels), closed tiles
+    may split one, which is checked by flooding outward from their neighbours
+    in lockstep and relabelling only the pieces that turn out to be cut off."""
+    def __init__(self, blocked):
+        self.grid = blocked
+        self.grid_w = blocked.grid_w
+        self.grid_h = blocked.grid_h
+        self.labels = array('i', [-1]) * (self.grid_w * self.grid_h)  # -1 = blocked
+        self.parent = []  # label -> label it was merged into (union-find)
+        self.snapshot = None
+        self.version = None
+        self.relabels = 0
+        self.updates = 0
+        self.relabel()
+
+    def refresh(self):
+        if self.grid.version == self.version:
+            return
+        cells = self.grid.cells
+        closed, opened = [], []
+        for i in changed_cells(self.snapshot, cells):
+            (closed if cells[i] else opened).append(i)
+        if len(closed) > 32:
+            # many scattered cuts: flooding from each is slower than starting over
+            self.relabel()
+            return
+        self._close(closed)
+        self._open(opened)
+        self.snapshot = bytes(cells)
+        self.version = self.grid.version
+        self.updates += 1
+
+    def relabel(self):
+        w, h = self.grid_w, self.grid_h
+        cells, labels = self.grid.cells, self.labels
+        for i in range(w * h):
+            labels[i] = -1
+        self.parent = []
+        for i in range(w * h):
+            if cells[i] or labels[i] != -1:
+                continue
+            label = self._new_label()
+            labels[i] = label
+            stack = [i]
+            while stack:
+                j = stack.pop()
+                for n in self._neighbors(j):
+                    if not cells[n] and labels[n] == -1:
+                        labels[n] = label
+                        stack.append(n)
+        self.snapshot = bytes(cells)
+        self.version = self.grid.version
+        self.relabels += 1
+
+    @property
+    def count(self):
+        # number of walkable regions (merged or emptied labels don't count)
+        return len({self.root(label) for label in set(self.labels) if label >= 0})
+
+    def root(self, label):
+        parent = self.parent
+        while parent[label] != label:
+            parent[label] = parent[parent[label]]
+            label = parent[label]
+        return label
+
+    def component(self, i):
+        # root label of tile index i, -1 if blocked
+        label = self.labels[i]
+        return -1 if label < 0 else self.root(label)
+
+    def is_reachable(self, a, b):
+        """True if tile a can walk to tile b; blocked or out-of-bounds tiles never can."""
+        self.refresh()
+        w, h = self.grid_w, self.grid_h
+        (ax, ay), (bx, by) = a, b
+        if not (0 <= ax < w and 0 <= ay < h and 0 <= bx < w and 0 <= by < h):
+            return False
+        ca = self.component(ay * w + ax)
+        return ca >= 0 and ca == self.component(by * w + bx)
+
+    def may_connect(self, a, b):
+        # False only when a path from tile index a to b is impossible
+        self.refresh()
+        cb = self.component(b)
+        if cb == -1:
+            return False
+        ca = self.component(a)
+        return ca == -1 or ca == cb  # a blocked start may still step out of its wall tile
+
+    def _neighbors(self, i):
+        w = self.grid_w
+        x = i % w
+        if x + 1 < w:
+            yield i + 1
+        if x > 0:
+            yield i - 1
+        if i + w < len(self.labels):
+            yield i + w
+        if i >= w:
+            yield i - w
+
+    def _new_label(self):
+        self.parent.append(len(self.parent))
+        return len(self.parent) - 1
+
+    def _open(self, opened):
+        # every opened tile joins (and merges) the regions around it
+        cells, labels = self.grid.cells, self.labels
+        for i in opened:
+            roots = {self.component(n) for n in self._neighbors(i) if not cells[n] and labels[n] >= 0}
+            if not roots:
+                labels[i] = self._new_label()
+                continue
+            keep = roots.pop()
+            for r in roots:
+                self.parent[r] = keep
+            labels[i] = keep
+
+    def _close(self, closed):
+        cells, labels = self.grid.cells, self.labels
+        seeds = {}  # old root -> free neighbours of closed tiles in that region
+        for i in closed:
+            labels[i] = -1
+        for i in closed:
+            for n in self._neighbors(i):
+                if not cells[n] and labels[n] >= 0:
+                    seeds.setdefault(self.component(n), set()).add(n)
+        for root, starts in seeds.items():
+            if len(starts) > 1:
+                self._split(root, list(starts))
+
+    def _split(self, root, starts):
+        # Flood from every start one tile at a time. Floods that touch are
+        # merged; a flood that runs dry before meeting the others is a region
+        # that got cut off and gets a new label. Stops once one flood is left,
+        # so the cost is the size of the smaller pieces, not the whole map.
+        cells, labels = self.grid.cells, self.labels
+        owner = {s: k for k, s in enumerate(starts)}
+        group = list(range(len(starts)))  # flood -> flood it merged into
+        frontier = {k: deque([s]) for k, s in enumerate(starts)}
+        members = {k: [s] for k, s in enumerate(starts)}
+
+        def find(k):
+            while group[k] != k:
+                group[k] = group[group[k]]
+                k = group[k]
+            return k
+
+        while len(frontier) > 1:
+            for k in list(frontier):
+                if k not in frontier:
+                    continue  # merged away earlier in this round
+                queue = frontier[k]
+                if not queue:
+                    # cut off: everything this flood reached is a new region
+                    label = self._new_label()
+                    for i in members.pop(k):
+                        labels[i] = label
+                    del frontier[k]
+                    if len(frontier) == 1:
+                        break
+                    continue
+                i = queue.popleft()
+                for n in self._neighbors(i):
+                    if cells[n] or labels[n] < 0 or self.root(labels[n]) != root:
+                        continue
+                    other = owner.get(n)
+                    if other is None:
+                        owner[n] = k
+                        queue.append(n)
+                        members[k].append(n)
+                        continue
+                    other = find(other)
+                    if other != k:
+                        # floods met: still connected, fold the other one into this one
+                        group[other] = k
+                        queue.extend(frontier.pop(other))
+                        members[k].extend(members.pop(other))
+                        if len(frontier) == 1:
+                            break
+
 # ---------------------- A* PATHFINDING ---------------
-def astar(start, goal, blocked, grid_w, grid_h):
+def astar_reference(start, goal, blocked, grid_w, grid_h):
+    # Original tuple/dict A* with a Euclidean heuristic, kept for benchmarks and checks
     if start == goal:
         return []
+    if not isinstance(blocked, OccupancyGrid):
+        blocked = OccupancyGrid(grid_w, grid_h, blocked)
+    cells = blocked.cells
 
     def h(a, b):
         dx = a[0] - b[0]
@@ -121,7 +754,7 @@ def astar(start, goal, blocked, grid_w, grid_h):
             nx, ny = n
             if nx < 0 or ny < 0 or nx >= grid_w or ny >= grid_h:
                 continue
-            if n in blocked:
+            if cells[ny * grid_w + nx]:
                 continue
             tentative_g = g + 1
             if tentative_g < gscore.get(n, 1e9):
@@ -129,23 +762,814 @@ def astar(start, goal, blocked, grid_w, grid_h):
                 heapq.heappush(open_heap, (tentative_g + h(n, goal), tentative_g, n, current))
     return []
 
+class SearchBuffers:
+    # score/parent buffers for one A* search at a time, reused via search_id stamps
+    def __init__(self, n):
+        self.gscore = array('i', [0]) * n
+        self.parent = array('i', [-1]) * n
+        self.seen = array('i', [0]) * n    # == search_id: gscore/parent are valid
+        self.closed = array('i', [0]) * n  # == search_id: already expanded
+        self.search_id = 0
+
+class AStarSearch:
+    """One A* query over flat tile indices that can run in slices.
+    step(max_expansions) returns True once finished; .path then holds the result
+    with the same conventions as astar. Start and goal in different connected
+    components finish immediately without expanding anything. If the grid
+    changes while the search is paused, it finishes with stale=True and path None."""
+    def __init__(self, solver, buffers, start, goal, blocked, pooled=False, path=None, cache_result=False):
+        self.solver = solver
+        self.buffers = buffers
+        self.pooled = pooled
+        self.cache_result = cache_result
+        self.start = start
+        self.goal = goal
+        self.blocked = blocked
+        self.version = blocked.version
+        self.path = None
+        self.done = False
+        self.stale = False
+        self.early_out = False
+        self.expanded = 0
+        self.open_heap = []
+        if path is not None:
+            self._finish(path)
+            return
+        w, h = solver.grid_w, solver.grid_h
+        sx, sy = start
+        gx, gy = goal
+        if start == goal or not (0 <= sx < w and 0 <= sy < h and 0 <= gx < w and 0 <= gy < h):
+            self._finish([])
+            return
+        self.s = sy * w + sx
+        self.t = gy * w + gx
+        if not blocked.components.may_connect(self.s, self.t):
+            self.early_out = True
+            self._finish([])
+            return
+        buffers.search_id += 1
+        self.sid = buffers.search_id
+        buffers.seen[self.s] = self.sid
+        buffers.gscore[self.s] = 0
+        buffers.parent[self.s] = -1
+        self.open_heap = [(abs(sx - gx) + abs(sy - gy)) << (2 * solver.shift) | self.s]
+
+    def step(self, max_expansions=None):
+        if self.done:
+            return True
+        if self.blocked.version != self.version:
+            self.stale = True
+            self._finish(None)
+            return True
+        solver, buffers = self.solver, self.buffers
+        w = solver.grid_w
+        gx, gy = self.goal
+        s, t, sid = self.s, self.t, self.sid
+        cells = self.blocked.cells
+        gscore, parent, seen, closed = buffers.gscore, buffers.parent, buffers.seen, buffers.closed
+        neighbors = solver.neighbors
+        shift = solver.shift
+        mask = (1 << shift) - 1
+        heappush, heappop = heapq.heappush, heapq.heappop
+        open_heap = self.open_heap
+        budget = max_expansions if max_expansions is not None else -1
+        expanded = 0
+
+        while open_heap:
+            if expanded == budget:
+                self.expanded += expanded
+                return False
+            i = heappop(open_heap) & mask
+            if closed[i] == sid:
+                continue
+            if i == t:
+                self.expanded += expanded
+                path = []
+                while i != s:
+                    path.append((i % w, i // w))
+                    i = parent[i]
+                path.reverse()
+                self._finish(path)
+                return True
+            closed[i] = sid
+            expanded += 1
+            ng = gscore[i] + 1
+            for n in neighbors[i]:
+                if cells[n] or closed[n] == sid:
+                    continue
+                if seen[n] != sid or ng < gscore[n]:
+                    seen[n] = sid
+                    gscore[n] = ng
+                    parent[n] = i
+                    f = ng + abs(n % w - gx) + abs(n // w - gy)
+                    heappush(open_heap, (f << shift | ng) << shift | n)
+        self.expanded += expanded
+        self._finish([])
+        return True
+
+    def cancel(self):
+        if not self.done:
+            self.stale = True
+            self._finish(None)
+
+    def _finish(self, path):
+        self.path = path
+        self.done = True
+        self.open_heap = []
+        if self.cache_result and path is not None:
+            path_cache.put(self.start, self.goal, self.blocked, path)
+        if self.pooled:
+            self.solver.spare.append(self.buffers)
+            self.pooled = False
+
+class GridAStar:
+    """A* over flat tile indices (ty * grid_w + tx) with a Manhattan heuristic.
+    Score/parent buffers are allocated once and reused: a per-search stamp tells
+    which entries belong to the current search, so nothing is cleared between calls.
+    search() runs to completion; begin() hands out a resumable AStarSearch with
+    its own pooled buffers."""
+    def __init__(self, grid_w, grid_h):
+        n = grid_w * grid_h
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        self.buffers = SearchBuffers(n)
+        self.spare = []  # SearchBuffers for time-sliced searches
+        # in-bounds neighbour indices per tile, 4-connected (blocked is checked per search)
+        self.neighbors = []
+        for i in range(n):
+            x, y = i % grid_w, i // grid_w
+            self.neighbors.append(tuple(ny * grid_w + nx for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1))
+                                        if 0 <= nx < grid_w and 0 <= ny < grid_h))
+        # heap entries are single ints ordered like (f, g, index)
+        self.shift = max(n.bit_length(), 1)
+        self.expanded = 0
+
+    def search(self, start, goal, blocked):
+        if not isinstance(blocked, OccupancyGrid):
+            blocked = OccupancyGrid(self.grid_w, self.grid_h, blocked)
+        query = AStarSearch(self, self.buffers, start, goal, blocked)
+        query.step()
+        self.expanded = query.expanded
+        return query.path
+
+    def begin(self, start, goal, blocked, cache_result=False):
+        buffers = self.spare.pop() if self.spare else SearchBuffers(self.grid_w * self.grid_h)
+        return AStarSearch(self, buffers, start, goal, blocked, pooled=True, cache_result=cache_result)
+
+class PathCache:
+    """LRU of astar results keyed by (start, goal, grid version).
+    OccupancyGrid.version changes whenever a Door opens or closes, which makes
+    every older entry unreachable; those are dropped as soon as that happens."""
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.grid = None
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+
+    def _sync(self, blocked):
+        if blocked is not self.grid or blocked.version != self.version:
+            self.entries.clear()
+            self.grid = blocked
+            self.version = blocked.version
+
+    def get(self, start, goal, blocked):
+        self._sync(blocked)
+        key = (start, goal, blocked.version)
+        path = self.entries.get(key)
+        if path is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return list(path)
+
+    def put(self, start, goal, blocked, path):
+        self._sync(blocked)
+        self.entries[(start, goal, blocked.version)] = tuple(path)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries),
+                'capacity': self.capacity, 'hit_rate': self.hits / lookups if lookups else 0.0}
+
+path_cache = PathCache(PATH_CACHE_SIZE)
+_astar_solvers = {}
+
+def astar_solver(grid_w, grid_h):
+    # one reusable solver per grid size
+    solver = _astar_solvers.get((grid_w, grid_h))
+    if solver is None:
+        solver = _astar_solvers[(grid_w, grid_h)] = GridAStar(grid_w, grid_h)
+    return solver
+
+def astar(start, goal, blocked, grid_w, grid_h):
+    if not isinstance(blocked, OccupancyGrid):
+        blocked = OccupancyGrid(grid_w, grid_h, blocked)
+    if not USE_PATH_CACHE:
+        return astar_solver(grid_w, grid_h).search(start, goal, blocked)
+    path = path_cache.get(start, goal, blocked)
+    if path is not None:
+        return path
+    path = astar_solver(grid_w, grid_h).search(start, goal, blocked)
+    path_cache.put(start, goal, blocked, path)
+    return path
+
+def astar_begin(start, goal, blocked, grid_w, grid_h):
+    """Time-sliced astar: returns an AStarSearch to step(). Cached paths come back finished."""
+    solver = astar_solver(grid_w, grid_h)
+    if not USE_PATH_CACHE:
+        return solver.begin(start, goal, blocked)
+    path = path_cache.get(start, goal, blocked)
+    if path is not None:
+        return AStarSearch(solver, None, start, goal, blocked, path=path)
+    return solver.begin(start, goal, blocked, cache_result=True)
+
+# ---------------------- HIERARCHICAL PATHS ----------
+class HierarchicalPlanner:
+    """Two-level (HPA*) planner. Clusters are the Rooms, plus HPA_BLOCK-sized blocks
+    for the corridor tiles between them. Wherever two clusters touch through free
+    tiles there is a portal (one per doorway/opening). The abstract graph holds
+    portal-to-portal distances inside each cluster, so a cross-map query is a
+    small Dijkstra over portals plus short searches inside the clusters used.
+    When doors change the grid only the clusters around the changed tiles are
+    rebuilt. Paths are valid and usually near-optimal, not guaranteed shortest."""
+    def __init__(self, grid_w, grid_h, rooms=(), block=16):
+        self.grid_w = grid_w
+        self.grid_h = grid_h
+        n = grid_w * grid_h
+        self.cluster = array('i', [-1]) * n
+        self.cluster_names = []
+        for room in rooms:
+            cid = len(self.cluster_names)
+            self.cluster_names.append(room.id)
+            for (tx, ty) in room.tiles:
+                if 0 <= tx < grid_w and 0 <= ty < grid_h and self.cluster[ty * grid_w + tx] == -1:
+                    self.cluster[ty * grid_w + tx] = cid
+        blocks = {}
+        for i in range(n):
+            if self.cluster[i] == -1:
+                key = ((i % grid_w) // block, (i // grid_w) // block)
+                if key not in blocks:
+                    blocks[key] = len(self.cluster_names)
+                    self.cluster_names.append(f'block{key}')
+                self.cluster[i] = blocks[key]
+        # per cluster the tiles next to another cluster: the only ones a portal can sit on
+        self.edges = [[] for _ in self.cluster_names]
+        cluster = self.cluster
+        for i in range(n):
+            x, y, cid = i % grid_w, i // grid_w, cluster[i]
+            if ((x + 1 < grid_w and cluster[i + 1] != cid) or (x > 0 and cluster[i - 1] != cid)
+                    or (y + 1 < grid_h and cluster[i + grid_w] != cid) or (y > 0 and cluster[i - grid_w] != cid)):
+                self.edges[cid].append(i)
+        self.grid = None
+        self.version = None
+        self.snapshot = None
+        self.borders = {}  # (cluster a, cluster b, axis, line) -> [(portal a, portal b)]
+        self.inter = {}    # portal tile -> portal tiles one step away in another cluster
+        self.intra = {}    # cluster id -> {portal tile: [(portal tile, distance)]}
+        self.portals = {}  # cluster id -> [portal tile]
+        self.todo = set()  # clusters whose intra table is out of date
+        self.rebuilds = 0
+        self.expanded = 0  # tiles and portal-graph entries visited, for PlannerSearch slicing
+
+    def refresh(self, blocked):
+        for _ in self.refresh_steps(blocked):
+            pass
+
+    def refresh_steps(self, blocked):
+        """refresh() in pieces: after rescanning the borders of the changed clusters
+        it yields every SEARCH_SLICE tiles and after every portal search, so a
+        PlannerSearch can spread the intra tables over frames."""
+        if blocked is not self.grid or self.snapshot is None:
+            self._rescan(blocked)
+            yield
+        elif blocked.version != self.version:
+            self._rescan(blocked, self._touched(blocked))
+            yield
+        cells = blocked.cells
+        while self.todo:
+            cid = min(self.todo)
+            portals = self.portals.get(cid, [])
+            table = {}
+            for p in portals:
+                dist, _ = yield from self._search(p, cells)
+                table[p] = [(q, dist[q]) for q in portals if q != p and q in dist]
+                yield
+            self.intra[cid] = table
+            self.todo.discard(cid)
+
+    def _touched(self, blocked):
+        # clusters holding or bordering a tile that changed since the last scan
+        w, h = self.grid_w, self.grid_h
+        cluster = self.cluster
+        touched = set()
+        for i in changed_cells(self.snapshot, blocked.cells):
+            x, y = i % w, i // w
+            touched.add(cluster[i])
+            for n, nx, ny in ((i + 1, x + 1, y), (i - 1, x - 1, y), (i + w, x, y + 1), (i - w, x, y - 1)):
+                if 0 <= nx < w and 0 <= ny < h:
+                    touched.add(cluster[n])
+        return touched
+
+    def rebuild(self, blocked, clusters=None):
+        self._rescan(blocked, clusters)
+        self.refresh(blocked)
+
+    def _rescan(self, blocked, clusters=None):
+        # portals on every border of these clusters; their intra tables go to todo
+        w, h = self.grid_w, self.grid_h
+        cells, cluster = blocked.cells, self.cluster
+        if clusters is None:
+            clusters = set(range(len(self.cluster_names)))
+            self.borders = {}
+            self.intra = {}
+
+        # rescan every border that has one of these clusters on either side
+        for key in [k for k in self.borders if k[0] in clusters or k[1] in clusters]:
+            del self.borders[key]
+        lines = {}
+        for cid in clusters:
+            self.expanded += len(self.edges[cid])
+            for i in self.edges[cid]:
+                if cells[i]:
+                    continue
+                x, y = i % w, i // w
+                for j, axis, line, pos, lo, hi, ok in ((i + 1, 'v', x, y, i, i + 1, x + 1 < w),
+                                                       (i - 1, 'v', x - 1, y, i - 1, i, x > 0),
+                                                       (i + w, 'h', y, x, i, i + w, y + 1 < h),
+                                                       (i - w, 'h', y - 1, x, i - w, i, y > 0)):
+                    if not ok or cells[j] or cluster[j] == cid:
+                        continue
+                    lines.setdefault((cluster[lo], cluster[hi], axis, line), set()).add((pos, lo, hi))
+        for key, pairs in lines.items():
+            pairs = sorted(pairs)
+            portals = []
+            run = [pairs[0]]
+            for pair in pairs[1:] + [None]:
+                if pair is not None and pair[0] == run[-1][0] + 1:
+                    run.append(pair)
+                    continue
+                # one portal pair in the middle of every contiguous opening
+                _, a, b = run[len(run) // 2]
+                portals.append((a, b))
+                run = [pair]
+            self.borders[key] = portals
+
+        self.inter = {}
+        self.portals = {}
+        for pairs in self.borders.values():
+            for a, b in pairs:
+                for tile, other in ((a, b), (b, a)):
+                    if tile not in self.inter:
+                        self.inter[tile] = []
+                        self.portals.setdefault(cluster[tile], []).append(tile)
+                    self.inter[tile].append(other)
+        for portals in self.portals.values():
+            portals.sort()
+        self.todo.update(clusters)
+
+        self.grid = blocked
+        self.version = blocked.version
+        self.snapshot = bytes(cells)
+        self.rebuilds += 1
+
+    def _search(self, src, cells, target=None):
+        # breadth-first search that never leaves the cluster of src, a generator
+        # that pauses every SEARCH_SLICE tiles and returns (dist, parent)
+        w, h = self.grid_w, self.grid_h
+        cluster = self.cluster
+        cid = cluster[src]
+        dist = {src: 0}
+        parent = {src: -1}
+        queue = deque([src])
+        counted = 0
+        while queue:
+            if len(dist) - counted >= SEARCH_SLICE:
+                self.expanded += len(dist) - counted
+                counted = len(dist)
+                yield
+            i = queue.popleft()
+            if i == target:
+                break
+            x, y = i % w, i // w
+            d = dist[i] + 1
+            for n, nx, ny in ((i + 1, x + 1, y), (i - 1, x - 1, y), (i + w, x, y + 1), (i - w, x, y - 1)):
+                if nx < 0 or ny < 0 or nx >= w or ny >= h:
+                    continue
+                if cells[n] or n in dist or cluster[n] != cid:
+                    continue
+                dist[n] = d
+                parent[n] = i
+                queue.append(n)
+        self.expanded += len(dist) - counted
+        return dist, parent
+
+    def _local_path(self, a, b, cells):
+        # tile indices from a (excluded) to b (included) inside one cluster, or None
+        dist, parent = yield from self._search(a, cells, b)
+        if b not in dist:
+            return None
+        path = []
+        while b != a:
+            path.append(b)
+            b = parent[b]
+        path.reverse()
+        return path
+
+    def same_cluster(self, a, b):
+        w = self.grid_w
+        return self.cluster[a[1] * w + a[0]] == self.cluster[b[1] * w + b[0]]
+
+    def find_path(self, start, goal, blocked):
+        """Same conventions as astar: start excluded, goal included, [] if unreachable."""
+        search = self.begin(start, goal, blocked)
+        search.step()
+        return search.path
+
+    def begin(self, start, goal, blocked):
+        return PlannerSearch(self, self._plan(start, goal, blocked), blocked)
+
+    def _plan(self, start, goal, blocked):
+        # find_path as a generator: pauses like _search, and after every cluster
+        # search and SEARCH_SLICE portal-graph entries; returns the path
+        if start == goal:
+            return []
+        w, h = self.grid_w, self.grid_h
+        if not (0 <= start[0] < w and 0 <= start[1] < h and 0 <= goal[0] < w and 0 <= goal[1] < h):
+            return []
+        yield from self.refresh_steps(blocked)
+        cells, cluster = blocked.cells, self.cluster
+        s = start[1] * w + start[0]
+        t = goal[1] * w + goal[0]
+        if cells[t]:
+            return []
+
+        if cluster[s] == cluster[t]:
+            local = yield from self._local_path(s, t, cells)
+            yield
+            if local is not None:
+                return [(i % w, i // w) for i in local]
+
+        # hook start and goal into the portal graph
+        start_dist, _ = yield from self._search(s, cells)
+        yield
+        goal_dist, _ = yield from self._search(t, cells)
+        yield
+        goal_cost = {p: goal_dist[p] for p in self.portals.get(cluster[t], ()) if p in goal_dist}
+        if not goal_cost:
+            return []
+
+        came_from = {}
+        heap = [(0, s, None)]
+        done = set()
+        end = None
+        popped = 0
+        while heap:
+            if popped == SEARCH_SLICE:
+                self.expanded += popped
+                popped = 0
+                yield
+            d, node, prev = heapq.heappop(heap)
+            popped += 1
+            if node in done:
+                continue
+            done.add(node)
+            came_from[node] = prev
+            if node == t:
+                end = node
+                break
+            if node == s:
+                for p in self.portals.get(cluster[s], ()):
+                    if p in start_dist and p != s:
+                        heapq.heappush(heap, (start_dist[p], p, s))
+            if node in goal_cost:
+                heapq.heappush(heap, (d + goal_cost[node], t, node))
+            for nxt in self.inter.get(node, ()):
+                if nxt not in done:
+                    heapq.heappush(heap, (d + 1, nxt, node))
+            for nxt, cost in self.intra.get(cluster[node], {}).get(node, ()):
+                if nxt not in done:
+                    heapq.heappush(heap, (d + cost, nxt, node))
+        self.expanded += popped
+        if end is None:
+            return []
+
+        waypoints = []
+        node = t
+        while node is not None:
+            waypoints.append(node)
+            node = came_from[node]
+        waypoints.reverse()
+
+        # refine: adjacent portal pairs are one step, everything else a local search
+        path = []
+        for a, b in zip(waypoints, waypoints[1:]):
+            if cluster[a] != cluster[b]:
+                path.append(b)
+            else:
+                path.extend((yield from self._local_path(a, b, cells)))
+                yield
+        return [(i % w, i // w) for i in path]
+
+class PlannerSearch:
+    """One HierarchicalPlanner query that can run in slices, like AStarSearch:
+    step(max_expansions) returns True once finished and .path then holds the
+    result. A planner left behind by a door catches up inside the same steps.
+    If the grid changes while paused, it finishes with stale=True and path None."""
+    def __init__(self, planner, steps, blocked):
+        self.planner = planner
+        self.steps = steps
+        self.blocked = blocked
+        self.version = blocked.version
+        self.path = None
+        self.done = False
+        self.stale = False
+        self.expanded = 0
+
+    def step(self, max_expansions=None):
+        if self.done:
+            return True
+        if self.blocked.version != self.version:
+            self.cancel()
+            return True
+        planner = self.planner
+        before = planner.expanded
+        try:
+            while True:
+                next(self.steps)
+                if max_expansions is not None and planner.expanded - before >= max_expansions:
+                    return False
+        except StopIteration as finished:
+            self._finish(finished.value)
+            return True
+        finally:
+            self.expanded += planner.expanded - before
+
+    def cancel(self):
+        if not self.done:
+            self.stale = True
+            self.steps.close()
+            self._finish(None)
+
+    def _finish(self, path):
+        self.path = path
+        self.done = True
+
+# ---------------------- PATH SCHEDULER --------------
+class PathScheduler:
+    """Spreads Enemy.request_path calls over frames. Enemies submit() instead of
+    searching right away; run() serves the queue until the per-frame budget is
+    spent, closest and longest-waiting enemies first. Long searches (A*, and
+    cross-cluster planner queries along with the portal tables a door made out
+    of date) are time-sliced: they pause at the deadline and resume next frame,
+    ahead of new requests. Meanwhile those enemies keep walking their old path."""
+    def __init__(self, budget_ms=2.0, stall_weight=0.5, slice_size=SEARCH_SLICE):
+        self.budget = budget_ms / 1000.0
+        self.stall_weight = stall_weight  # tiles of distance one frame of waiting is worth
+        self.slice_size = slice_size      # expansions between deadline checks
+        self.pending = {}                 # enemy -> frame it was queued
+        self.active = {}                  # enemy -> paused AStarSearch
+        self.frame = 0
+        self.served = 0
+        self.carried = 0
+        self.resumed = 0
+        self.restarted = 0
+        self.max_wait = 0
+
+    def submit(self, enemy):
+        if enemy not in self.pending and enemy not in self.active:
+            self.pending[enemy] = self.frame
+
+    def _step_until(self, search, deadline):
+        # at least one slice per call, so paused searches always make progress
+        while not search.step(self.slice_size):
+            if time.perf_counter() >= deadline:
+                return False
+        return True
+
+    def _finish(self, enemy, search):
+        if search.stale:
+            # the grid changed under the search (door), plan again from scratch
+            self.restarted += 1
+            enemy.path_cooldown = 0
+            enemy.last_player_tile = None
+            self.submit(enemy)
+        else:
+            enemy.set_path(search.path)
+            self.served += 1
+
+    def run(self, player_rect, blocked_tiles, grid_w, grid_h, planner=None):
+        self.frame += 1
+        if not self.pending and not self.active:
+            return
+        deadline = time.perf_counter() + self.budget
+        for e, search in list(self.active.items()):
+            if not e.alive():
+                search.cancel()
+                del self.active[e]
+                continue
+            self.resumed += 1
+            if self._step_until(search, deadline):
+                del self.active[e]
+                self._finish(e, search)
+            if time.perf_counter() >= deadline:
+                self.carried += len(self.pending)
+                return
+        px, py = player_rect.center
+        queue = [((abs(e.x - px) + abs(e.y - py)) / TILE - self.stall_weight * (self.frame - queued), id(e), e)
+                 for e, queued in self.pending.items()]
+        heapq.heapify(queue)
+        while queue:
+            if time.perf_counter() >= deadline:
+                self.carried += len(queue)
+                return
+            _, _, e = heapq.heappop(queue)
+            self.max_wait = max(self.max_wait, self.frame - self.pending.pop(e))
+            if not e.alive():
+                continue
+            search = e.request_path(player_rect, blocked_tiles, grid_w, grid_h, planner, resumable=True)
+            if search is None:
+                self.served += 1
+            elif self._step_until(search, deadline):
+                self._finish(e, search)
+            else:
+                self.active[e] = search
+            # always serve at least one request so nobody starves
+            if time.perf_counter() >= deadline:
+                break
+        self.carried += len(self.pending)
+
 # ---------------------- SPRITES ----------------------
+def asset_key(path):
+    # sprite paths are written Windows style ('Assets\img\...'), the atlas stores them with '/' for every OS
+    return str(path).replace('\\', '/')
+
 class SpriteSheet:
-    def __init__(self, path):
+    def __init__(self, path, index=None):
         self.sheet = pygame.image.load(path).convert_alpha()
+        # atlas mode: (source path, frame_rect, scale) -> (x, y, w, h) in this sheet
+        self.index = index
+
+    @classmethod
+    def from_atlas(cls, image_path=ATLAS_IMG, index_path=ATLAS_INDEX):
+        """Atlas written by build_atlas.py. Entries whose source PNG changed size
+        since the build are left out, so those frames get cut from the sheet again."""
+        with open(index_path) as f:
+            entries = json.load(f)['frames']
+        index = {}
+        for entry in entries:
+            path = asset_key(entry['path'])
+            try:
+                if os.path.getsize(path) != entry['source_size']:
+                    continue
+            except OSError:
+                continue
+            frame = tuple(entry['frame']) if entry['frame'] is not None else None
+            index[(path, frame, entry['scale'])] = tuple(entry['rect'])
+        return cls(str(image_path), index)
 
     def get_frame(self, x, y, w, h):
         frame = pygame.Surface((w, h), pygame.SRCALPHA)
         frame.blit(self.sheet, (0, 0), (x, y, w, h))
         return frame
 
+    def get_packed(self, path, frame_rect=None, scale=1.0):
+        # atlas mode: the pre-scaled frame as a subsurface (shares the atlas pixels), None if not packed
+        rect = self.index.get((asset_key(path), tuple(frame_rect) if frame_rect is not None else None, scale))
+        return self.sheet.subsurface(rect) if rect is not None else None
+
+def pack_frames(sizes, width):
+    """Shelf packing: [(x, y)] for sizes [(w, h)] in a strip width px wide, plus the height used."""
+    order = sorted(range(len(sizes)), key=lambda i: -sizes[i][1])
+    spots = [None] * len(sizes)
+    x = y = shelf_h = 0
+    for i in order:
+        w, h = sizes[i]
+        if x + w > width:
+            x, y, shelf_h = 0, y + shelf_h, 0
+        spots[i] = (x, y)
+        x += w
+        shelf_h = max(shelf_h, h)
+    return spots, y + shelf_h
+
+class AssetRegistry:
+    """Process-wide image cache keyed by (path, frame_rect, scale): every sheet is
+    read from disk once and every frame is cut out and scaled once, no matter
+    how many sprites use it. Returned surfaces are shared, don't draw on them."""
+    def __init__(self):
+        self.sheets = {}  # path -> SpriteSheet
+        self.images = {}  # (path, frame_rect, scale) -> Surface
+        self.atlas = None  # SpriteSheet in atlas mode, tried before the source sheets
+        self.disk_loads = 0
+        self.hits = 0
+
+    def load_atlas(self, image_path=ATLAS_IMG, index_path=ATLAS_INDEX):
+        # False (and sheets as before) when build_atlas.py hasn't been run
+        try:
+            self.atlas = SpriteSheet.from_atlas(image_path, index_path)
+        except (OSError, ValueError, KeyError, pygame.error):
+            self.atlas = None
+            return False
+        self.disk_loads += 1
+        return True
+
+    def sheet(self, path):
+        path = str(path)
+        sheet = self.sheets.get(path)
+        if sheet is None:
+            sheet = self.sheets[path] = SpriteSheet(path)
+            self.disk_loads += 1
+        return sheet
+
+    def get(self, path, frame_rect=None, scale=1.0):
+        # frame_rect None = the whole image
+        key = (str(path), tuple(frame_rect) if frame_rect is not None else None, scale)
+        image = self.images.get(key)
+        if image is not None:
+            self.hits += 1
+            return image
+        if self.atlas is not None:
+            image = self.atlas.get_packed(*key)
+            if image is not None:
+                self.images[key] = image
+                return image
+        sheet = self.sheet(path)
+        image = sheet.get_frame(*frame_rect) if frame_rect is not None else sheet.sheet
+        if scale != 1.0:
+            image = pygame.transform.scale_by(image, scale)
+        self.images[key] = image
+        return image
+
+    def preload(self, specs):
+        # specs: (path, frame_rect, scale) tuples, e.g. every enemy class's SPRITE
+        for spec in specs:
+            self.get(*spec)
+
+    def release_sheets(self):
+        # full sheets are only needed to cut frames; cut frames stay cached
+        self.sheets.clear()
+
+    def memory_report(self):
+        """[(name, (w, h), bytes)] for every sheet and cached frame, largest first."""
+        rows = [(f'sheet {path}', sheet.sheet.get_size(), sheet.sheet.get_pitch() * sheet.sheet.get_height())
+                for path, sheet in self.sheets.items()]
+        if self.atlas is not None:
+            atlas = self.atlas.sheet
+            rows.append(('atlas', atlas.get_size(), atlas.get_pitch() * atlas.get_height()))
+        # atlas subsurfaces share the atlas pixels, so they count 0 here
+        rows += [(f'{path} {rect} x{scale}', image.get_size(),
+                  0 if image.get_parent() is not None else image.get_pitch() * image.get_height())
+                 for (path, rect, scale), image in self.images.items()]
+        return sorted(rows, key=lambda row: -row[2])
+
+assets = AssetRegistry()
+
+class TextCache:
+    """Fonts per (path, size), loaded once, and rendered text surfaces per
+    (text, size, color) in an LRU, so menus and the HUD only call render()
+    when a string or value actually changes. Returned surfaces are shared."""
+    def __init__(self, max_surfaces=TEXT_CACHE_SIZE):
+        self.max_surfaces = max_surfaces
+        self.fonts = {}              # (path, size) -> Font
+        self.surfaces = OrderedDict()  # (path, text, size, color, antialias) -> Surface
+        self.renders = 0
+        self.hits = 0
+
+    def font(self, size, path=FONT_PATH):
+        key = (str(path), size)
+        font = self.fonts.get(key)
+        if font is None:
+            font = self.fonts[key] = pygame.font.Font(str(path), size)
+        return font
+
+    def render(self, text, size, color=(255, 255, 255), path=FONT_PATH, antialias=True):
+        key = (str(path), text, size, tuple(color), antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        surface = self.surfaces[key] = self.font(size, path).render(text, antialias, color)
+        self.renders += 1
+        if len(self.surfaces) > self.max_surfaces:
+            self.surfaces.popitem(last=False)
+        return surface
+
+text_cache = TextCache()
+
 class Player(pygame.sprite.Sprite):
     def __init__(self, x, y, speed=4, max_hp=20, cooldown=3):
         super().__init__()
-        # Load hero sprite (Path -> str)
-        self.image = pygame.image.load(str('Assets\img\Hero_basic_24x24.png')).convert_alpha()
-        # scale pixel art (x2)
-        self.image = pygame.transform.scale_by(self.image, 2)
+        # Hero sprite, pixel art scaled x2 (cached across restarts)
+        self.image = assets.get(*HERO_SPRITE)
         self.rect = self.image.get_rect(topleft=(x, y))
         self.x = float(x)
         self.y = float(y)
@@ -182,18 +1606,9 @@ class Player(pygame.sprite.Sprite):
     def process_event(self, event):
         """Call from the main event loop to track KEYDOWN/KEYUP state for smooth movement."""
         keys = pygame.key.get_pressed()
-        if keys[pygame.K_q]:
-            if channel2.get_busy() == False:
-                channel2.play(sfx_voetstappen)
-        if keys[pygame.K_s]:
-            if channel2.get_busy() == False:
-                channel2.play(sfx_voetstappen)
-        if keys[pygame.K_d]:
-            if channel2.get_busy() == False:
-                channel2.play(sfx_voetstappen)
-        if keys[pygame.K_z]:
-            if channel2.get_busy() == False:
-                channel2.play(sfx_voetstappen)
+        if keys[pygame.K_q] or keys[pygame.K_s] or keys[pygame.K_d] or keys[pygame.K_z]:
+            # one footstep voice, no restart while it plays (see VOICE_LIMITS)
+            voices.play('voetstappen', PRIORITY_LOW)
 
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_q:
@@ -217,12 +1632,12 @@ class Player(pygame.sprite.Sprite):
     def move(self, dx, dy, walls):
         self.x += dx
         self.rect.topleft = (int(self.x), int(self.y))
-        if pygame.sprite.spritecollideany(self, walls):
+        if walls.collides(self.rect):
             self.x -= dx
             self.rect.topleft = (int(self.x), int(self.y))
         self.y += dy
         self.rect.topleft = (int(self.x), int(self.y))
-        if pygame.sprite.spritecollideany(self, walls):
+        if walls.collides(self.rect):
             self.y -= dy
             self.rect.topleft = (int(self.x), int(self.y))
 
@@ -243,7 +1658,7 @@ class Player(pygame.sprite.Sprite):
             self.hp -= amount
             self.vincible = True
             self.last_hit = current_time
-            channel4.play(sfx_damage)
+            voices.play('damage', PRIORITY_HIGH)
         if self.hp <= 0: self.die()
 
     def die(self):
@@ -252,6 +1667,9 @@ class Player(pygame.sprite.Sprite):
         self.hp <= 0
 
 class Enemy(pygame.sprite.Sprite):
+    # (sheet path, frame rect, scale) -> (normal, hit flash) images, shared by all instances
+    sprite_variants = {}
+
     def __init__(self, x, y, speed, damage, hp=2):
         super().__init__()
         self.image = pygame.Surface((20, 20), pygame.SRCALPHA)  # placeholder
@@ -267,24 +1685,25 @@ class Enemy(pygame.sprite.Sprite):
         self.path_index = 0
         self.path_cooldown = 0
         self.last_player_tile = None
+        self.following_flow = False
         self.damage = damage
 
     def give_damage(self):
         return self.damage
 
     def update(self, walls, world_rect):
+        # shared images: never draw on self.image in place
         if self.invul > 0:
             self.invul -= 1
-            self.image = self.base_image.copy()
-            self.image.fill((255, 80, 80), special_flags=pygame.BLEND_RGBA_ADD)
+            self.image = self.flash_image
         else:
-            self.image = self.base_image.copy()
+            self.image = self.base_image
 
         if abs(self.kb_vx) > 0.01 or abs(self.kb_vy) > 0.01:
             self.x += self.kb_vx
             self.y += self.kb_vy
             self.rect.center = (int(self.x), int(self.y))
-            if pygame.sprite.spritecollideany(self, walls):
+            if walls.collides(self.rect):
                 self.x -= self.kb_vx
                 self.y -= self.kb_vy
                 self.rect.center = (int(self.x), int(self.y))
@@ -316,32 +1735,57 @@ class Enemy(pygame.sprite.Sprite):
         if dist < 4:
             self.path_index += 1
 
-    def request_path(self, player_rect, blocked_tiles, grid_w, grid_h):
+    def request_path(self, player_rect, blocked_tiles, grid_w, grid_h, planner=None, resumable=False):
+        """Plan a path to the player. With resumable=True the search is returned
+        unfinished (an AStarSearch, or a PlannerSearch across clusters) for the
+        caller to step and hand to set_path."""
         if self.path_cooldown > 0:
-            return
+            return None
         my_tile = (int(self.x) // TILE, int(self.y) // TILE)
         player_tile = (player_rect.centerx // TILE, player_rect.centery // TILE)
         if self.last_player_tile == player_tile and self.path:
-            return
-        self.last_player_tile = player_tile
-        def find_near_free(tile):
-            if tile not in blocked_tiles:
-                return tile
-            for dx in (-1, 0, 1):
-                for dy in (-1, 0, 1):
-                    cand = (tile[0] + dx, tile[1] + dy)
-                    if 0 <= cand[0] < grid_w and 0 <= cand[1] < grid_h and cand not in blocked_tiles:
-                        return cand
             return None
-        my_tile = find_near_free(my_tile)
-        player_tile = find_near_free(player_tile)
+        self.last_player_tile = player_tile
+        my_tile = find_near_free(my_tile, blocked_tiles, grid_w, grid_h)
+        player_tile = find_near_free(player_tile, blocked_tiles, grid_w, grid_h)
         if my_tile is None or player_tile is None:
-            return
-        path = astar(my_tile, player_tile, blocked_tiles, grid_w, grid_h)
+            return None
+        if not blocked_tiles.components.is_reachable(my_tile, player_tile):
+            self.set_path([])  # walled off (closed door): wait instead of searching
+            return None
+        if planner is not None and not planner.same_cluster(my_tile, player_tile):
+            if resumable:
+                return planner.begin(my_tile, player_tile, blocked_tiles)
+            path = planner.find_path(my_tile, player_tile, blocked_tiles)
+        elif resumable:
+            search = astar_begin(my_tile, player_tile, blocked_tiles, grid_w, grid_h)
+            if not search.done:
+                return search
+            path = search.path
+        else:
+            path = astar(my_tile, player_tile, blocked_tiles, grid_w, grid_h)
+        self.set_path(path)
+        return None
+
+    def set_path(self, path):
         self.path = path
         self.path_index = 0
+        self.following_flow = False
         self.path_cooldown = 12
 
+    def follow_flow(self, flow_field):
+        """Take the next tile from the shared flow field. False if it has none for us."""
+        if self.following_flow and self.path_index < len(self.path):
+            return True  # still walking to the last step
+        step = flow_field.next_step((int(self.x) // TILE, int(self.y) // TILE))
+        if step is None:
+            self.following_flow = False
+            return False
+        self.path = [step]
+        self.path_index = 0
+        self.following_flow = True
+        return True
+
     def tick_path_cooldown(self):
         if self.path_cooldown > 0:
             self.path_cooldown -= 1
@@ -355,28 +1799,31 @@ class Enemy(pygame.sprite.Sprite):
         self.kb_vy += kb_y
         return self.hp <= 0
     
-    def set_sprite(self, sheet_path, frame_rect, scale=1.0):
-
-        sheet = SpriteSheet(str(sheet_path))
-        image = sheet.get_frame(*frame_rect)
+    @staticmethod
+    def sprite_images(sheet_path, frame_rect, scale=1.0):
+        key = (str(sheet_path), tuple(frame_rect), scale)
+        variants = Enemy.sprite_variants.get(key)
+        if variants is None:
+            image = assets.get(sheet_path, frame_rect, scale)
+            # red hit flash, made once per type instead of every frame
+            flash = image.copy()
+            flash.fill((255, 80, 80), special_flags=pygame.BLEND_RGBA_ADD)
+            variants = Enemy.sprite_variants[key] = (image, flash)
+        return variants
 
-        if scale != 1.0:
-            image = pygame.transform.scale_by(image, scale)
-
-        self.base_image = image          
-        self.image = image.copy()
+    def set_sprite(self, sheet_path, frame_rect, scale=1.0):
+        self.base_image, self.flash_image = Enemy.sprite_images(sheet_path, frame_rect, scale)
+        self.image = self.base_image
         self.rect = self.image.get_rect(center=(self.x, self.y))
 
 
 class FastEnemy(Enemy):
+    SPRITE = ("Assets\img\Bat basic.png", (0, 0, 320, 320), 0.1)
+
     def __init__(self, x, y,speed=1,damage=1, hp=1):
         super().__init__(x, y, speed,damage, hp)
 
-        self.set_sprite(
-            "Assets\img\Bat basic.png",
-            frame_rect=(0, 0, 320, 320),
-            scale=0.1
-        )
+        self.set_sprite(*self.SPRITE)
 
         self.speed *= 1.5
         # self.image.fill((0, 0, 255))
@@ -385,15 +1832,13 @@ class FastEnemy(Enemy):
         return self.damage
     
 class vampireLord(Enemy):
+    SPRITE = ("Assets\img\Vamp lord basic Big.png", (0, 0, 640, 640), 0.1)
+
     def __init__(self, x, y, speed=1, damage=0, hp=10):
         super().__init__(x,y,speed, damage,hp)
         self.spawn_cooldown = 180
 
-        self.set_sprite(
-            "Assets\img\Vamp lord basic Big.png",
-            frame_rect=(0, 0, 640, 640),
-            scale=0.1
-        )
+        self.set_sprite(*self.SPRITE)
 
     def update(self,walls,world_rect):
         super().update(walls,world_rect)
@@ -412,12 +1857,7 @@ class vampireLord(Enemy):
                 if not world_rect.collidepoint(int(spawn_x), int(spawn_y)):
                     continue
                 spawn_rect = pygame.Rect(int(spawn_x) - 10, int(spawn_y) - 10, 20, 20)
-                collision = False
-                for w in walls:
-                    if spawn_rect.colliderect(w.rect):
-                        collision = True
-                        break
-                if collision:
+                if walls.collides(spawn_rect):
                     continue
                 # acceptable spawn found
                 found = True
@@ -429,14 +1869,12 @@ class vampireLord(Enemy):
         return events
 
 class Boss(Enemy):
+    SPRITE = ("Assets\img\Minotaur Basic.png", (0, 0, 960, 960), 0.1)
+
     def __init__(self, x, y, speed=1, damage=4, hp=20):
         super().__init__(x, y, speed, damage, hp)
 
-        self.set_sprite(
-            "Assets\img\Minotaur Basic.png",
-            frame_rect=(0, 0, 960, 960),
-            scale=0.1
-        )
+        self.set_sprite(*self.SPRITE)
 
         self.aoe_cooldown_max = 180
         self.charge_cooldown_max = 240
@@ -465,7 +1903,7 @@ class Boss(Enemy):
             self.rect.center = (int(self.x), int(self.y))
             self.charge_duration -= 1
             
-            if self.charge_duration <= 0 or pygame.sprite.spritecollideany(self, walls):
+            if self.charge_duration <= 0 or walls.collides(self.rect):
                 self.charging = False
                 self.charge_timer = self.charge_cooldown_max
 
@@ -492,25 +1930,21 @@ class Boss(Enemy):
 
 
 class Tank(Enemy):
+    SPRITE = ("Assets\img\Brute basic.png", (0, 0, 640, 640), 0.1)
+
     def __init__(self, x, y, speed=.5,damage=2, hp=5):
         super().__init__(x, y, speed,damage, hp)
 
-        self.set_sprite(
-            "Assets\img\Brute basic.png",
-            frame_rect=(0, 0, 640, 640),
-            scale=0.1
-        ) 
+        self.set_sprite(*self.SPRITE) 
 
 class charger(Enemy):
+    SPRITE = ("Assets\img\slime basic.png", (0, 0, 320, 320), 0.1)
+
     def __init__(self, x, y, speed=1, damage=1, hp=2):
         # We zetten speed op 0 in de super, omdat we zijn beweging zelf regelen
         super().__init__(x, y, speed, damage, hp )
 
-        self.set_sprite(
-            "Assets\img\slime basic.png",
-            frame_rect=(0, 0, 320, 320),
-            scale=0.1
-        )
+        self.set_sprite(*self.SPRITE)
         self.base_speed = speed # De snelheid van de charge zelf
         self.charge_speed_mult = 5.0 # Hoeveel keer sneller hij gaat tijdens een charge
         
@@ -540,7 +1974,7 @@ class charger(Enemy):
             self.rect.center = (int(self.x), int(self.y))
             
             # Stop als we een muur raken
-            if pygame.sprite.spritecollideany(self, walls):
+            if walls.collides(self.rect):
                 self.state = "IDLE"
                 self.timer = 90 # Extra lange pauze na een botsing
                 
@@ -575,22 +2009,20 @@ class Projectile(pygame.sprite.Sprite):
         self.life -= 1
         if self.life <= 0:
             self.kill()
-        if pygame.sprite.spritecollideany(self, walls):
+        if walls.collides(self.rect):
             self.kill()
     
     def give_damage(self):
         return self.damage
 
 class RangedEnemy(Enemy):
+    SPRITE = ("Assets\img\\ranger basic.png", (0, 0, 480, 480), 0.1)
+
     def __init__(self, x, y, speed=1, hp=3):
         super().__init__(x, y, speed, hp)
         self.shooting_cooldown = 120
         
-        self.set_sprite(
-            "Assets\img\\ranger basic.png",
-            frame_rect=(0, 0, 480, 480),
-            scale=0.1
-        )
+        self.set_sprite(*self.SPRITE)
 
     def update(self, walls, world_rect):
         super().update(walls, world_rect)
@@ -608,9 +2040,110 @@ class Wall(pygame.sprite.Sprite):
     def __init__(self, rect):
         super().__init__()
         self.rect = rect.copy()
-        # Semi-transparent debug overlay (comment out draw if not needed)
-        self.image = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
-        self.image.fill((250, 0, 250, 80))
+        self._image = None
+
+    @property
+    def image(self):
+        # Semi-transparent debug overlay, only allocated when something draws it
+        if self._image is None:
+            self._image = pygame.Surface((self.rect.width, self.rect.height), pygame.SRCALPHA)
+            self._image.fill((250, 0, 250, 80))
+        return self._image
+
+class RotationCache:
+    """An image pre-rotated at `steps` evenly spaced angles. get() returns the
+    frame nearest to an angle plus the offset from its center to its top left,
+    so drawing a rotated sprite is a list lookup instead of transform.rotate."""
+    def __init__(self, image, steps=SWORD_ANGLES):
+        self.steps = steps
+        self.frames = [pygame.transform.rotate(image, i * 360 / steps) for i in range(steps)]
+        self.offsets = [(-(f.get_width() // 2), -(f.get_height() // 2)) for f in self.frames]
+
+    def index(self, angle_deg):
+        return round(angle_deg * self.steps / 360) % self.steps
+
+    def get(self, angle_deg):
+        i = self.index(angle_deg)
+        return self.frames[i], self.offsets[i]
+
+    def rect(self, angle_deg, center):
+        # same as frame.get_rect(center=center)
+        frame, (ox, oy) = self.get(angle_deg)
+        return frame, pygame.Rect(int(center[0]) + ox, int(center[1]) + oy, frame.get_width(), frame.get_height())
+
+ENEMY_CLASSES = (FastEnemy, vampireLord, Boss, Tank, charger, RangedEnemy)
+
+def atlas_specs():
+    # every (path, frame_rect, scale) build_atlas.py packs
+    return [cls.SPRITE for cls in ENEMY_CLASSES] + [HERO_SPRITE]
+
+def preload_enemy_sprites(release_sheets=True):
+    """Cut, scale and flash-tint every enemy sprite up front, so the first spawn
+    of a type (or a vampire's bat) never reads a PNG mid-game."""
+    assets.preload([cls.SPRITE for cls in ENEMY_CLASSES])
+    for cls in ENEMY_CLASSES:
+        Enemy.sprite_images(*cls.SPRITE)  # hit flashes, from the frames cut above
+    if release_sheets:
+        assets.release_sheets()
+
+# ---------------------- COLLISION GRID --------------
+class WallGrid:
+    """Wall sprites bucketed per tile, so a collision query only looks at the
+    few tiles under a rect instead of scanning every wall on the map.
+    Behaves like a sprite Group for add/remove/iteration (Door.open/close)."""
+    def __init__(self, cell=32):
+        self.cell = cell
+        self.buckets = {}
+        self.group = pygame.sprite.Group()
+
+    def _cells(self, rect):
+        c = self.cell
+        for ty in range(rect.top // c, (rect.bottom - 1) // c + 1):
+            for tx in range(rect.left // c, (rect.right - 1) // c + 1):
+                yield (tx, ty)
+
+    def add(self, *sprites):
+        for sprite in sprites:
+            if self.group.has(sprite):
+                continue
+            self.group.add(sprite)
+            for key in self._cells(sprite.rect):
+                self.buckets.setdefault(key, []).append(sprite)
+
+    def remove(self, *sprites):
+        for sprite in sprites:
+            if not self.group.has(sprite):
+                continue
+            self.group.remove(sprite)
+            for key in self._cells(sprite.rect):
+                bucket = self.buckets[key]
+                bucket.remove(sprite)
+                if not bucket:
+                    del self.buckets[key]
+
+    def collides(self, rect):
+        if rect.width <= 0 or rect.height <= 0:
+            return False
+        buckets = self.buckets
+        for key in self._cells(rect):
+            bucket = buckets.get(key)
+            if bucket:
+                for w in bucket:
+                    if rect.colliderect(w.rect):
+                        return True
+        return False
+
+    def sprites(self):
+        return self.group.sprites()
+
+    def __iter__(self):
+        return iter(self.group)
+
+    def __len__(self):
+        return len(self.group)
+
+    def __contains__(self, sprite):
+        return self.group.has(sprite)
 
 class Room (pygame.sprite.Sprite):
     def __init__(self,roomid, x, y, w, h, doors, enemies):
@@ -629,6 +2162,10 @@ class Room (pygame.sprite.Sprite):
             for tx in range(self.rect.left // TILE, self.rect.right // TILE)
             for ty in range(self.rect.top // TILE, self.rect.bottom // TILE)
         }
+    def tile_bounds(self):
+        # (tx0, ty0, tx1, ty1) covering self.tiles, end exclusive
+        return (self.rect.left // TILE, self.rect.top // TILE, self.rect.right // TILE, self.rect.bottom // TILE)
+
     def give_enemies(self,i):
         return self.monsters[i]
     
@@ -680,6 +2217,7 @@ class Door(pygame.sprite.Sprite):
     
     def close(self, blocked_tiles, walls):
         if self.opened:
+            # add/discard bump blocked_tiles.version, which invalidates path_cache and the flow field
             for tile in self.tiles:
                 blocked_tiles.add(tile)
             for sprite in self.wall_sprites:
@@ -711,7 +2249,8 @@ class Door(pygame.sprite.Sprite):
 
 # ---------------------- MAP LOADING -----------------
 
-def build_world_from_map(map_surface, TILE=32, alpha_threshold=8):
+def classify_tiles_loop(map_surface, TILE=32, alpha_threshold=8):
+    # Reference implementation: one get_at per tile (slow, kept for benchmarks)
     world_w, world_h = map_surface.get_size()
     grid_w = world_w // TILE
     grid_h = world_h // TILE
@@ -732,19 +2271,171 @@ def build_world_from_map(map_surface, TILE=32, alpha_threshold=8):
                     blocked_tiles.add((tx, ty))
     finally:
         map_surface.unlock()
+    return blocked_tiles
+
+def sample_tile_centers(map_surface, TILE=32):
+    """Return a grid_w x grid_h surface holding the centre pixel of every tile."""
+    world_w, world_h = map_surface.get_size()
+    grid_w = world_w // TILE
+    grid_h = world_h // TILE
+    pixels = pygame.PixelArray(map_surface)
+    try:
+        sampled = pixels[TILE // 2:grid_w * TILE:TILE, TILE // 2:grid_h * TILE:TILE]
+        return sampled.make_surface()
+    finally:
+        pixels.close()
+
+def classify_tiles(map_surface, TILE=32, alpha_threshold=8):
+    # Batched version of classify_tiles_loop: same blocked_tiles, no get_at per tile
+    world_w, world_h = map_surface.get_size()
+    grid_w = world_w // TILE
+    grid_h = world_h // TILE
+    if grid_w == 0 or grid_h == 0:
+        return set()
+
+    centers = sample_tile_centers(map_surface, TILE)
+
+    if np is not None:
+        rgb = pygame.surfarray.array3d(centers).astype(np.float64)  # shape (grid_w, grid_h, 3)
+        lum = 0.2126 * rgb[:, :, 0] + 0.7152 * rgb[:, :, 1] + 0.0722 * rgb[:, :, 2]
+        xs, ys = np.nonzero(lum > alpha_threshold)
+        return set(zip(xs.tolist(), ys.tolist()))
+
+    # Pure python fallback: one RGB byte string, row-major (ty * grid_w + tx)
+    data = pygame.image.tobytes(centers, 'RGB')
+    blocked_tiles = set()
+    for i, (r, g, b) in enumerate(zip(data[0::3], data[1::3], data[2::3])):
+        lum = 0.2126 * r + 0.7152 * g + 0.0722 * b
+        if lum > alpha_threshold:
+            blocked_tiles.add((i % grid_w, i // grid_w))
+    return blocked_tiles
+
+def merge_tiles(tiles):
+    """Greedy meshing: cover `tiles` with few (tx, ty, tw, th) rectangles."""
+    remaining = set(tiles)
+    rects = []
+    for (tx, ty) in sorted(remaining, key=lambda t: (t[1], t[0])):
+        if (tx, ty) not in remaining:
+            continue
+        # grow to the right as far as the run goes
+        tw = 1
+        while (tx + tw, ty) in remaining:
+            tw += 1
+        # then grow down while the whole row below is free to take
+        th = 1
+        while all((x, ty + th) in remaining for x in range(tx, tx + tw)):
+            th += 1
+        for y in range(ty, ty + th):
+            for x in range(tx, tx + tw):
+                remaining.discard((x, y))
+        rects.append((tx, ty, tw, th))
+    return rects
+
+def build_world_from_map(map_surface, TILE=32, alpha_threshold=8, merge_walls=False, blocked_tiles=None,
+                         world_size=None):
+    # with blocked_tiles and world_size given, map_surface isn't needed (None)
+    world_w, world_h = world_size or map_surface.get_size()
+    grid_w = world_w // TILE
+    grid_h = world_h // TILE
 
-    walls = pygame.sprite.Group()
-    for (tx, ty) in blocked_tiles:
-        rect = pygame.Rect(tx * TILE, ty * TILE, TILE, TILE)
-        walls.add(Wall(rect))
+    if blocked_tiles is None:
+        blocked_tiles = classify_tiles(map_surface, TILE, alpha_threshold)
+    if not isinstance(blocked_tiles, OccupancyGrid):
+        blocked_tiles = OccupancyGrid(grid_w, grid_h, blocked_tiles)
+
+    walls = WallGrid(TILE)
+    if merge_walls:
+        # doors bring their own 1x1 walls (Door.wall_sprites), map walls under them never toggle
+        for (tx, ty, tw, th) in merge_tiles(blocked_tiles):
+            walls.add(Wall(pygame.Rect(tx * TILE, ty * TILE, tw * TILE, th * TILE)))
+    else:
+        for (tx, ty) in blocked_tiles:
+            rect = pygame.Rect(tx * TILE, ty * TILE, TILE, TILE)
+            walls.add(Wall(rect))
 
     return world_w, world_h, grid_w, grid_h, blocked_tiles, walls
 
+# ---------------------- WORLD CACHE -----------------
+# One file per (map content, TILE, alpha_threshold): a small header followed by
+# the blocked-tile bitmap, one bit per tile, row-major (ty * grid_w + tx).
+GRID_CACHE_MAGIC = b'DDWG'
+GRID_CACHE_VERSION = 1
+GRID_CACHE_HEADER = struct.Struct('<4sHIIII')  # magic, version, world_w, world_h, grid_w, grid_h
+
+def pack_tiles(tiles, grid_w, grid_h):
+    bits = bytearray((grid_w * grid_h + 7) // 8)
+    for (tx, ty) in tiles:
+        i = ty * grid_w + tx
+        bits[i >> 3] |= 0x80 >> (i & 7)
+    return bytes(bits)
+
+def unpack_tiles(bits, grid_w, grid_h):
+    tiles = set()
+    for byte_index, byte in enumerate(bits):
+        if not byte:
+            continue
+        for bit in range(8):
+            if byte & (0x80 >> bit):
+                i = byte_index * 8 + bit
+                if i < grid_w * grid_h:
+                    tiles.add((i % grid_w, i // grid_w))
+    return tiles
+
+def grid_cache_path(map_path, TILE, alpha_threshold):
+    digest = hashlib.sha1(Path(map_path).read_bytes()).hexdigest()[:16]
+    return CACHE_DIR / f'world_{digest}_{TILE}_{alpha_threshold}.bin'
+
+def load_grid_cache(cache_path, world_w, world_h, TILE):
+    try:
+        data = cache_path.read_bytes()
+    except OSError:
+        return None
+    if len(data) < GRID_CACHE_HEADER.size:
+        return None
+    magic, version, cw, ch, gw, gh = GRID_CACHE_HEADER.unpack_from(data)
+    if (magic, version, cw, ch, gw, gh) != (GRID_CACHE_MAGIC, GRID_CACHE_VERSION,
+                                           world_w, world_h, world_w // TILE, world_h // TILE):
+        return None
+    bits = data[GRID_CACHE_HEADER.size:]
+    if len(bits) != (gw * gh + 7) // 8:
+        return None
+    return unpack_tiles(bits, gw, gh)
+
+def save_grid_cache(cache_path, blocked_tiles, world_w, world_h, TILE):
+    grid_w, grid_h = world_w // TILE, world_h // TILE
+    header = GRID_CACHE_HEADER.pack(GRID_CACHE_MAGIC, GRID_CACHE_VERSION, world_w, world_h, grid_w, grid_h)
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # drop entries for older versions of this map (same TILE/threshold, other hash)
+        suffix = cache_path.name.split('_', 2)[2]
+        for old in cache_path.parent.glob(f'world_*_{suffix}'):
+            if old != cache_path:
+                old.unlink()
+        tmp_path = cache_path.with_suffix('.tmp')
+        tmp_path.write_bytes(header + pack_tiles(blocked_tiles, grid_w, grid_h))
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # a read-only install just means no cache
+        pass
+
+def cached_world_from_map(map_path, world_size, load_map, TILE=32, alpha_threshold=8, **kwargs):
+    """build_world_from_map, but the blocked-tile grid comes from CACHE_DIR when
+    the map file (by content hash), TILE and alpha_threshold are unchanged.
+    load_map() returns the map at world size and is only called on a cache miss."""
+    world_w, world_h = world_size
+    cache_path = grid_cache_path(map_path, TILE, alpha_threshold)
+    blocked_tiles = load_grid_cache(cache_path, world_w, world_h, TILE)
+    if blocked_tiles is None:
+        blocked_tiles = classify_tiles(load_map(), TILE, alpha_threshold)
+        save_grid_cache(cache_path, blocked_tiles, world_w, world_h, TILE)
+    return build_world_from_map(None, TILE, alpha_threshold, blocked_tiles=blocked_tiles,
+                                world_size=world_size, **kwargs)
+
 # ---------------------- MAIN -------------------------
 def pause_game(screen, clock, game):
     pygame.init()
     paused = True
-    font = pygame.font.Font('Assets\8-BIT WONDER.TTF', 30)
+    font_size = 30
     menu_state = 'Main'
 
     options = ['Resume', 'Volume', 'Quit']
@@ -806,13 +2497,13 @@ def pause_game(screen, clock, game):
         screen.blit(overlay, (0, 0))
 
         if menu_state == 'Main':
-            text = font.render('Paused', True, (255, 255, 255))
+            text = text_cache.render('Paused', font_size)
             rect = text.get_rect(center = (mid_w, mid_h - 60))
             screen.blit(text, rect)
 
             for i, option in enumerate(options):
                 color = (255, 255, 255)
-                text_surface = font.render(option, True, color)
+                text_surface = text_cache.render(option, font_size, color)
                 text_rectangle = text_surface.get_rect(center = (mid_w, mid_h + i * 40))
                 screen.blit(text_surface, text_rectangle)
 
@@ -821,8 +2512,8 @@ def pause_game(screen, clock, game):
             pygame.draw.polygon(screen, (255, 255, 255), [(cursor_x, cursor_y), (cursor_x + 15, cursor_y + 10), (cursor_x, cursor_y + 20)])
 
         elif menu_state == 'Volume':
-            title = font.render('Volume', True, (255, 255, 255))
-            value = font.render(f'{game.volume} / 10', True, (255, 255, 255))
+            title = text_cache.render('Volume', font_size)
+            value = text_cache.render(f'{game.volume} / 10', font_size)
 
             screen.blit(title, title.get_rect(center=(mid_w, mid_h - 40)))
             screen.blit(value, value.get_rect(center=(mid_w, mid_h + 10)))
@@ -837,10 +2528,16 @@ def main(game):
     pygame.display.set_caption('Game')
     screen = pygame.display.set_mode((SCREEN_W, SCREEN_H))
     clock = pygame.time.Clock()
+    # every enemy sprite + hit flash now, not on its first spawn (from the atlas if built)
+    if assets.atlas is None:  # once per process, not on every Play Again
+        assets.load_atlas()
+    preload_enemy_sprites()
+    sound_bank.warm_up(GAMEPLAY_SOUNDS)  # decodes in the background, first hits don't wait
 
     # Load sword sprite AFTER display init
     SWORD_IMG = pygame.image.load("Assets\img\Sword.png").convert_alpha()
     SWORD_IMG = pygame.transform.scale_by(SWORD_IMG, 0.1)  # scale sword
+    sword_rotations = RotationCache(SWORD_IMG, SWORD_ANGLES)
 
     # Load key sprite sheet (try several common paths). If not found, fallback to None.
     key_sheet = None
@@ -877,13 +2574,15 @@ def main(game):
                 health_frames.append(frame)
 
     # Font for HUD (8-BIT WONDER)
-    HUD_FONT = pygame.font.Font(str(Path('Assets') / '8-BIT WONDER.TTF'), 20)
+    HUD_FONT_SIZE = 20
+    HUD_FONT = text_cache.font(HUD_FONT_SIZE)
    
 
     # Load map image (Path -> str)
-    map_surface = pygame.image.load(str('Assets\img\map.png')).convert()
-    # scale pixel art (x2)
-    map_surface = pygame.transform.scale_by(map_surface, 2)
+    map_path = 'Assets\img\map.png'
+    map_image = pygame.image.load(map_path).convert()
+    # drawn in chunks cropped from the unscaled image (x2 pixel art)
+    map_chunks = MapChunks(map_image, MAP_SCALE)
 
     # Load spike sprite sheet (for door decoration). Try common filenames.
     spike_sheet = None
@@ -897,14 +2596,27 @@ def main(game):
             frame = pygame.transform.scale_by(frame, 0.1)
             spike_frames.append(frame)
 
-    # Build world from map without surfarray
-    world_w, world_h, grid_w, grid_h, blocked_tiles, walls = build_world_from_map(
-        map_surface, TILE=TILE, alpha_threshold=8
+    # Build world from map, merging blocked tiles into large wall rects
+    # (blocked tiles come from the on-disk cache unless map.png changed; only
+    # then is the full map scaled up to sample it, ~74 MB)
+    world_w, world_h, grid_w, grid_h, blocked_tiles, walls = cached_world_from_map(
+        map_path, map_chunks.get_size(), lambda: pygame.transform.scale_by(map_image, MAP_SCALE),
+        TILE=TILE, alpha_threshold=8, merge_walls=True
     )
     world_rect = pygame.Rect(0, 0, world_w, world_h)
+    # label walkable regions now; doors keep them up to date (is_reachable)
+    blocked_tiles.components.refresh()
 
     # Camera uses real map size
     camera = Camera(SCREEN_W, SCREEN_H, world_w, world_h)
+    background = ScrollingBackground(map_chunks, screen.get_size())
+    dirty = DirtyRects(DIRTY_RECTS)
+    camera.dirty = dirty
+
+    # Shared distance map toward the player for all chasing enemies
+    flow_field = FlowField(grid_w, grid_h)
+    # astar/planner requests are queued and served within PATH_BUDGET_MS per frame
+    path_scheduler = PathScheduler(PATH_BUDGET_MS)
 
     pygame.mixer.init()
     pygame.mixer.music.load('sounds\muziek.ogg')
@@ -987,6 +2699,11 @@ def main(game):
     rooms.add(Room("room2_fix",863,2829,960,723,door2,[5,6,6,2]))
     rooms.add(Room("room3_fix",3551,3500,769,629,door3,[6,4,4,2]))
     rooms.add(Room("boss",1631,45,1538,819,door_boss,[3]))
+
+    # Room/portal graph for long paths (e.g. the boss chasing across the map)
+    planner = HierarchicalPlanner(grid_w, grid_h, rooms, HPA_BLOCK) if USE_HPA else None
+    if planner is not None:
+        planner.refresh(blocked_tiles)  # full build at load time, not mid-frame on the first long path
     # Combat state
     attacking = False
     attack_timer = 0
@@ -1015,6 +2732,7 @@ def main(game):
                 if event.button == 1 and not attacking and player.cooldown_timer == 0:
                     attacking = True
                     attack_timer = ATTACK_DURATION
+                    voices.play('zwaard')
 
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
@@ -1023,7 +2741,7 @@ def main(game):
             if paused:
                 pygame.event.clear(pygame.KEYDOWN)
                 result = pause_game(screen, clock, game)
-            
+                dirty.mark_full()  # the pause menu drew over everything
 
                 if result == 'Quit':
                     return
@@ -1040,6 +2758,13 @@ def main(game):
         player_moved_tile = new_player_tile != player_tile
         player_tile = new_player_tile
 
+        # Rebuilt only when the player changes tile or a door opens/closes
+        if USE_FLOW_FIELD and enemies:
+            flow_bounds = None
+            if current_room and current_room.contains(player):
+                flow_bounds = current_room.tile_bounds()
+            flow_field.update(player_tile, blocked_tiles, flow_bounds)
+
         for e in list(enemies):
             e.tick_path_cooldown()
             old_x, old_y = e.x, e.y  # Onthoud positie voor collision revert
@@ -1055,8 +2780,10 @@ def main(game):
                         e.start_charge(player)
                     else:
                         # Normale Boss beweging (volgt pad)
-                        if player_moved_tile or e.path_cooldown == 0:
-                            e.request_path(player.rect, blocked_tiles, grid_w, grid_h)
+                        if USE_FLOW_FIELD and e.follow_flow(flow_field):
+                            pass
+                        elif player_moved_tile or e.path_cooldown == 0:
+                            path_scheduler.submit(e)
                         e.move_along_path()
                 # Als hij wel aan het chargen is, beweegt hij in zijn e.update() later
 
@@ -1067,8 +2794,10 @@ def main(game):
 
             else:
                 # NORMALE ENEMIES & VAMPIRELORD
-                if player_moved_tile or e.path_cooldown == 0:
-                    e.request_path(player.rect, blocked_tiles, grid_w, grid_h)
+                if USE_FLOW_FIELD and e.follow_flow(flow_field):
+                    pass
+                elif player_moved_tile or e.path_cooldown == 0:
+                    path_scheduler.submit(e)
 
                 if e.path:
                     e.move_along_path()
@@ -1112,7 +2841,7 @@ def main(game):
             
             collided = False
             # Check muur
-            if pygame.sprite.spritecollideany(e, walls):
+            if walls.collides(e.rect):
                 collided = True
             # Check speler
             elif e.rect.colliderect(player.rect):
@@ -1139,6 +2868,9 @@ def main(game):
             e.rect.clamp_ip(world_rect)
             e.x, e.y = float(e.rect.centerx), float(e.rect.centery)
 
+        # serve queued path requests; new paths are picked up next frame
+        path_scheduler.run(player.rect, blocked_tiles, grid_w, grid_h, planner)
+
         arrow  = pygame.sprite.spritecollideany(player, Projectile_group) 
         if arrow:
             player.take_damage(arrow.give_damage())
@@ -1154,15 +2886,13 @@ def main(game):
             dir_x = world_mx - player.rect.centerx
             dir_y = world_my - player.rect.centery
             length_dir = math.hypot(dir_x, dir_y)
-            if channel1.get_busy() == False:
-               channel1.play(sfx_zwaard)
             if length_dir != 0:
                 dir_x /= length_dir
                 dir_y /= length_dir
             t = (ATTACK_DURATION - attack_timer) / ATTACK_DURATION
             angle_offset = (t - 0.5) * ARC_ANGLE
             sword_hitbox = get_mouse_sword_hitbox(player.rect, dir_x, dir_y, angle_offset)
-            if sword_hitbox and rect_collides_walls(sword_hitbox, walls):
+            if sword_hitbox and walls.collides(sword_hitbox):
                 sword_hitbox = None
             if sword_hitbox:
                 for e in list(enemies):
@@ -1170,8 +2900,8 @@ def main(game):
                         kb_dx = e.rect.centerx - player.rect.centerx
                         kb_dy = e.rect.centery - player.rect.centery
                         kb_len = math.hypot(kb_dx, kb_dy)
-                        if channel3.get_busy() == False:
-                            channel3.play(sfx_punch)
+                        if e.invul <= 0:
+                            voices.play('punch')  # only hits that land, each its own voice
                         if kb_len == 0:
                             kb_dx, kb_dy = 0.0, -1.0
                             kb_len = 1.0
@@ -1214,7 +2944,7 @@ def main(game):
             if not current_room.doors[0].opened and current_room.count == 0:
                 current_room.count = 1
                 free_tiles = current_room.tiles - blocked_tiles
-                locations = spawn_locations(free_tiles,len(current_room.monsters),player)
+                locations = spawn_locations(free_tiles,len(current_room.monsters),player,blocked_tiles)
                 for i in range(len(locations)):
                     ex,ey = locations[i]
                     spawntype = current_room.give_enemies(i)
@@ -1237,8 +2967,10 @@ def main(game):
             current_room.unlock(blocked_tiles,walls)
 
         # Draw
-        screen.fill((0, 0, 0))
-        screen.blit(map_surface, (-camera.offset.x, -camera.offset.y))
+        camera.reset_stats()
+        background.draw(screen, camera)
+        if background.repainted:
+            dirty.mark_full()  # camera moved: every pixel changed
         #Draw spike decoration for non-boss doors (one spike frame per door tile)
         # for d in Doors:
         #     if d is bossdoor:
@@ -1270,18 +3002,13 @@ def main(game):
             angle_deg = math.degrees(math.atan2(-dir_y, dir_x))
             angle_deg += -90 # adjust sword img rotation 
 
-            # Rotate sword sprite (does NOT affect collision)
-            rotated_sword = pygame.transform.rotate(SWORD_IMG, angle_deg)
-
-            # Draw sword centered on hitbox
-            sword_rect = rotated_sword.get_rect(
-                center=(
-                    sword_hitbox.centerx - camera.offset.x,
-                    sword_hitbox.centery - camera.offset.y
-                )
+            # Nearest pre-rotated sword sprite (does NOT affect collision), centered on hitbox
+            rotated_sword, sword_rect = sword_rotations.rect(
+                angle_deg,
+                (sword_hitbox.centerx - camera.offset.x, sword_hitbox.centery - camera.offset.y)
             )
 
-            screen.blit(rotated_sword, sword_rect)
+            dirty.add(screen.blit(rotated_sword, sword_rect))
 
 
         # Debug: sword rect
@@ -1318,10 +3045,10 @@ def main(game):
             k_w, k_h = key_img.get_size()
             hud_x = 8
             hud_y = screen.get_height() - k_h - 8
-            screen.blit(key_img, (hud_x, hud_y))
+            dirty.add(screen.blit(key_img, (hud_x, hud_y)))
             # render number next to key
-            txt = HUD_FONT.render(str(current_keys), True, (255, 255, 255))
-            screen.blit(txt, (hud_x + k_w + 6, hud_y + (k_h - txt.get_height()) // 2))
+            txt = text_cache.render(str(current_keys), HUD_FONT_SIZE)
+            dirty.add(screen.blit(txt, (hud_x + k_w + 6, hud_y + (k_h - txt.get_height()) // 2)))
             # Draw animated health icon + HP amount to the right of the keys
             try:
                 if health_frames:
@@ -1335,17 +3062,17 @@ def main(game):
                     number_w = txt.get_width()
                     hx = hud_x + k_w + 6 + number_w + 12
                     hy = hud_y + (k_h - h_h) // 2
-                    screen.blit(heart_img, (hx, hy))
-                    hp_txt = HUD_FONT.render(str(player.hp), True, (255, 255, 255))
-                    screen.blit(hp_txt, (hx + h_w + 6, hy + (h_h - hp_txt.get_height()) // 2))
+                    dirty.add(screen.blit(heart_img, (hx, hy)))
+                    hp_txt = text_cache.render(str(player.hp), HUD_FONT_SIZE)
+                    dirty.add(screen.blit(hp_txt, (hx + h_w + 6, hy + (h_h - hp_txt.get_height()) // 2)))
                 else:
                     # fallback: red square + HP number
                     number_w = txt.get_width()
                     hx = hud_x + k_w + 6 + number_w + 12
                     hy = hud_y
-                    pygame.draw.rect(screen, (200, 40, 40), (hx, hy, 16, 16))
-                    hp_txt = HUD_FONT.render(str(player.hp), True, (255, 255, 255))
-                    screen.blit(hp_txt, (hx + 20, hy - 2))
+                    dirty.add(pygame.draw.rect(screen, (200, 40, 40), (hx, hy, 16, 16)))
+                    hp_txt = text_cache.render(str(player.hp), HUD_FONT_SIZE)
+                    dirty.add(screen.blit(hp_txt, (hx + 20, hy - 2)))
             except Exception:
                 # if anything goes wrong drawing health, silently continue
                 pass
@@ -1353,9 +3080,16 @@ def main(game):
             # fallback: draw a simple yellow key rectangle and number
             hud_x = 8
             hud_y = screen.get_height() - 16 - 8
-            pygame.draw.rect(screen, (220, 200, 20), (hud_x, hud_y, 16, 8))
-            txt = HUD_FONT.render(str(current_keys), True, (255, 255, 255))
-            screen.blit(txt, (hud_x + 22, hud_y - 2))
+            dirty.add(pygame.draw.rect(screen, (220, 200, 20), (hud_x, hud_y, 16, 8)))
+            txt = text_cache.render(str(current_keys), HUD_FONT_SIZE)
+            dirty.add(screen.blit(txt, (hud_x + 22, hud_y - 2)))
+
+        if SHOW_DRAW_STATS:
+            stats_txt = (f'map px {background.repainted}  blits {camera.blits}  '
+                         f'sorted {camera.sorted}  culled {camera.culled}')
+            stats_txt += f'  flips {dirty.flips}  rect updates {dirty.updates}'
+            stats_txt += f'  voices {voices.playing()} dropped {voices.dropped} stolen {voices.stolen}'
+            dirty.add(screen.blit(HUD_FONT.render(stats_txt, True, (255, 255, 0)), (8, 8)))
 
         if player.hp <= 0:
             return "GAME_OVER"
@@ -1363,7 +3097,7 @@ def main(game):
         if player.rect.colliderect(VICTORY_ZONE):
             return 'VICTORY'
 
-        pygame.display.flip()
+        dirty.present()
 
     # pygame.quit()
     return
\ No newline at end of file
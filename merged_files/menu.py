@@ -1,12 +1,180 @@
 import pygame
+import hashlib
+import os
+import struct
+import threading
+from pathlib import Path
+from cache import CACHE_DIR
+
+MENU_FPS = 60  # frame cap for menus that animate; static menus sleep until input arrives
+# the window lost its pixels (uncovered, restored): present again even if nothing changed
+EXPOSE_EVENTS = (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWSHOWN, pygame.WINDOWRESTORED)
+LOGO_SHEET = 'Assets\img\Logo_gold_2.png'
+LOGO_FRAME = (1280, 580)                    # one frame on the sheet
+LOGO_SIZE = (600, int(580 * 600/1280))      # as drawn in the main menu
+LOGO_LAZY = True    # read frames from the cache one at a time instead of all at startup
+LOGO_RING = 8       # frames kept in memory in lazy mode
+
+# ---------------------- LOGO CACHE ------------------
+# The scaled frames as raw RGBA, so later runs skip decoding the 6400x7540 sheet:
+# a small header followed by count frames of w * h * 4 bytes each.
+LOGO_CACHE_MAGIC = b'DDLF'
+LOGO_CACHE_VERSION = 1
+LOGO_CACHE_HEADER = struct.Struct('<4sHHHH')  # magic, version, count, w, h
+
+def logo_cache_path(sheet_path, size, cache_dir=CACHE_DIR):
+    digest = hashlib.sha1(Path(sheet_path).read_bytes()).hexdigest()[:16]
+    return cache_dir / f'logo_{digest}_{size[0]}x{size[1]}.raw'
+
+def scale_logo_frames(sheet_path, frame_size=LOGO_FRAME, size=LOGO_SIZE):
+    # what MainMenu used to do at startup; no convert_alpha so it can run off the main thread
+    sheet = pygame.image.load(sheet_path)
+    frame_w, frame_h = frame_size
+    frames = []
+    for row in range(sheet.get_height()//frame_h):
+        for col in range(sheet.get_width()//frame_w):
+            # in the sheet's own pixel format, blits between formats are slow
+            frame = pygame.Surface(frame_size, pygame.SRCALPHA, 32, sheet.get_masks())
+            frame.blit(sheet, (0, 0), (col * frame_w, row * frame_h, frame_w, frame_h))
+            frames.append(pygame.transform.smoothscale(frame, size))
+    return frames
+
+def save_logo_cache(cache_path, frames, size):
+    header = LOGO_CACHE_HEADER.pack(LOGO_CACHE_MAGIC, LOGO_CACHE_VERSION, len(frames), *size)
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # drop frames of an older sheet at the same size
+        suffix = cache_path.name.split('_', 2)[2]
+        for old in cache_path.parent.glob(f'logo_*_{suffix}'):
+            if old != cache_path:
+                old.unlink()
+        tmp_path = cache_path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+            for frame in frames:
+                f.write(pygame.image.tobytes(frame, 'RGBA'))
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # a read-only install just means no cache
+        return False
+    return True
+
+class LogoFrames:
+    """The main menu logo frames, indexable like the old list.
+    With a cache file, eager mode reads every frame at startup (no sheet decode)
+    and lazy mode reads a frame when it is first shown, keeping the last `ring`
+    in memory. Without one (first run) the sheet is scaled and the cache written,
+    in a background thread in lazy mode; len() is 0 until that is done."""
+    def __init__(self, sheet_path=LOGO_SHEET, frame_size=LOGO_FRAME, size=LOGO_SIZE,
+                 lazy=LOGO_LAZY, ring=LOGO_RING, cache_dir=CACHE_DIR):
+        self.sheet_path, self.frame_size, self.size = sheet_path, frame_size, size
+        self.frame_bytes = size[0] * size[1] * 4
+        self.cache_path = logo_cache_path(sheet_path, size, cache_dir)
+        self.count = 0
+        self.frames = None          # all frames, when they live in memory
+        self.ring = [None] * ring   # lazy mode: (index, surface) per slot
+        self.file = None
+        self.built = None
+        self.builder = None
+        self.reads = 0
+
+        if self.open_cache():
+            if not lazy:
+                self.frames = [self.read(i) for i in range(self.count)]
+                self.close()
+        elif lazy:
+            self.builder = threading.Thread(target=self.build, daemon=True)
+            self.builder.start()
+        else:
+            self.build()
+            self.keep_built()
+
+    def build(self):
+        frames = scale_logo_frames(self.sheet_path, self.frame_size, self.size)
+        if save_logo_cache(self.cache_path, frames, self.size) and self.builder is not None:
+            frames = None   # lazy mode reads them back from the cache
+        self.built = frames
+
+    def keep_built(self):
+        self.frames = [frame.convert_alpha() for frame in self.built]
+        self.count = len(self.frames)
+        self.built = None
+
+    def poll(self):
+        # pick up the result of a background build (convert_alpha belongs on the main thread)
+        if self.builder is not None and not self.builder.is_alive():
+            self.builder = None
+            if self.built is not None:
+                self.keep_built()   # no cache could be written, keep the frames themselves
+            else:
+                self.open_cache()
+
+    def open_cache(self):
+        try:
+            f = open(self.cache_path, 'rb')
+        except OSError:
+            return False
+        header = f.read(LOGO_CACHE_HEADER.size)
+        if len(header) == LOGO_CACHE_HEADER.size:
+            magic, version, count, w, h = LOGO_CACHE_HEADER.unpack(header)
+            expected = LOGO_CACHE_HEADER.size + count * self.frame_bytes
+            if ((magic, version, (w, h)) == (LOGO_CACHE_MAGIC, LOGO_CACHE_VERSION, self.size)
+                    and os.fstat(f.fileno()).st_size == expected):
+                self.file, self.count = f, count
+                return True
+        f.close()
+        return False
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def read(self, index):
+        self.file.seek(LOGO_CACHE_HEADER.size + index * self.frame_bytes)
+        data = self.file.read(self.frame_bytes)
+        self.reads += 1
+        return pygame.image.frombuffer(data, self.size, 'RGBA').convert_alpha()
+
+    def __len__(self):
+        self.poll()
+        return self.count
+
+    def __getitem__(self, index):
+        if self.frames is not None:
+            return self.frames[index]
+        slot = index % len(self.ring)
+        entry = self.ring[slot]
+        if entry is None or entry[0] != index:
+            entry = self.ring[slot] = (index, self.read(index))
+        return entry[1]
+
+    def memory(self):
+        # bytes of decoded frames currently held
+        held = self.frames if self.frames is not None else [e[1] for e in self.ring if e is not None]
+        return sum(frame.get_bytesize() * frame.get_width() * frame.get_height() for frame in held)
+
+# ---------------------- MENUS -----------------------
 
 class Menu():
+    """Shared menu loop. A static menu (animated = False) blocks in
+    pygame.event.wait() and only redraws after input changed what it shows;
+    an animated one runs at MENU_FPS. Subclasses draw their fixed content in
+    draw_static(), which is rendered once per view_key() into a cached surface,
+    and anything moving in draw_animated() on top of it every frame."""
+    animated = False
+
     def __init__(self, game):
         self.game = game
         self.mid_w, self.mid_h = self.game.display_w/2, self.game.display_h/2
         self.run_display = True
         self.cursor_rectangle = pygame.Rect(0, 0, 20, 20)
         self.offset = -100
+        self.clock = pygame.time.Clock()
+        self.cached = None      # display as draw_static() left it
+        self.cached_key = None
+        self.shown = False      # game.display currently shows this menu
+        self.redraws = 0
 
     def draw_cursor(self):
         self.game.draw_text('*', 15, self.cursor_rectangle.x, self.cursor_rectangle.y)
@@ -16,7 +184,66 @@ class Menu():
         pygame.display.update()
         self.game.reset_keys()
 
+    def open(self):
+        # called every time the menu is shown
+        pass
+
+    def view_key(self):
+        # everything draw_static() depends on; a new key redraws the cached surface
+        return (getattr(self, 'state', None), self.cursor_rectangle.topleft)
+
+    def draw_static(self):
+        pass
+
+    def draw_animated(self):
+        pass
+
+    def render(self):
+        """Bring game.display up to date, False if it already shows this frame."""
+        key = self.view_key()
+        if self.cached is None or key != self.cached_key:
+            self.game.display.fill(self.game.black)
+            self.draw_static()
+            self.cached = self.game.display.copy()
+            self.cached_key = key
+            self.redraws += 1
+        elif self.animated or not self.shown:
+            self.game.display.blit(self.cached, (0, 0))
+        else:
+            return False
+        self.shown = True
+        self.draw_animated()
+        return True
+
+    def wait(self):
+        # events for the next check_events; None = whatever is queued after the frame cap
+        if self.animated:
+            self.clock.tick(MENU_FPS)
+            return None
+        return [pygame.event.wait()] + pygame.event.get()
+
+    def display_menu(self):
+        self.run_display = True
+        self.shown = False  # another menu may have drawn on game.display meanwhile
+        self.open()
+        events = None
+        while self.run_display:
+            self.game.check_events(events)
+            self.check_input()
+            exposed = events is not None and any(e.type in EXPOSE_EVENTS for e in events)
+            if self.render() or exposed:
+                self.blit_screen()
+            else:
+                self.game.reset_keys()
+            if self.run_display:
+                events = self.wait()
+
+    def check_input(self):
+        pass
+
 class MainMenu(Menu):
+    animated = True  # the logo; the text below it comes from the cached surface
+
     def __init__(self, game):
         Menu.__init__(self, game)
         self.state = 'Start'
@@ -26,22 +253,14 @@ class MainMenu(Menu):
         self.exitx, self.exity = self.mid_w, self.mid_h + 150
         self.cursor_rectangle.midtop = (self.startx + self.offset, self.starty)
         
-        self.logo_sheet = pygame.image.load('Assets\img\Logo_gold_2.png').convert_alpha()
-        self.frame_width = 1280
-        self.frame_height = 580
-        self.columns = self.logo_sheet.get_width()//self.frame_width
-        self.rows = self.logo_sheet.get_height()//self.frame_height
-        self.logo_frames = []
-        for row in range(self.rows):
-            for col in range(self.columns):
-                frame = pygame.Surface((self.frame_width, self.frame_height), pygame.SRCALPHA)
-                frame.blit(self.logo_sheet, (0, 0), (col * self.frame_width, row * self.frame_height, self.frame_width, self.frame_height))
-                scaled_frame = pygame.transform.smoothscale(frame, (600, int(580 * 600/1280)))
-                self.logo_frames.append(scaled_frame)
+        # scaled frames come from CACHE_DIR after the first run, see LogoFrames
+        self.logo_frames = LogoFrames()
         self.current_frame = 0
         self.animation_speed = 0.07
 
     def draw_logo_animation(self):
+        if not len(self.logo_frames):
+            return  # first run, still being scaled in the background
         self.current_frame += self.animation_speed
         if self.current_frame >= len(self.logo_frames):
             self.current_frame = 0
@@ -52,20 +271,17 @@ class MainMenu(Menu):
         y = 40
         self.game.display.blit(frame, (x, y))
 
-    def display_menu(self):
-        self.run_display = True
-        while self.run_display:
-            self.game.check_events()
-            self.check_input()
-            self.game.display.fill(self.game.black)
-            self.draw_logo_animation()
-            self.game.draw_text('Main Menu', 20, self.game.display_w/2, self.game.display_h/2+ 40)
-            self.game.draw_text('Start Game', 20, self.startx, self.starty)
-            self.game.draw_text('Options', 20, self.optionsx, self.optionsy)
-            self.game.draw_text('Credits', 20, self.creditsx, self.creditsy)
-            self.game.draw_text('Exit', 20, self.exitx, self.exity)
-            self.draw_cursor()
-            self.blit_screen()
+    def draw_static(self):
+        self.game.draw_text('Main Menu', 20, self.game.display_w/2, self.game.display_h/2+ 40)
+        self.game.draw_text('Start Game', 20, self.startx, self.starty)
+        self.game.draw_text('Options', 20, self.optionsx, self.optionsy)
+        self.game.draw_text('Credits', 20, self.creditsx, self.creditsy)
+        self.game.draw_text('Exit', 20, self.exitx, self.exity)
+        self.draw_cursor()
+
+    def draw_animated(self):
+        # logo and text don't overlap, so drawing the logo last looks the same
+        self.draw_logo_animation()
 
     def move_cursor(self):
         if self.game.DOWN_KEY:
@@ -122,17 +338,11 @@ class OptionsMenu(Menu):
         self.controlsx, self.controlsy = self.mid_w, self.mid_h + 40
         self.cursor_rectangle.midtop = (self.volx + self.offset, self.voly)
 
-    def display_menu(self):
-        self.run_display = True
-        while self.run_display:
-            self.game.check_events()
-            self.check_input()
-            self.game.display.fill((0, 0, 0))
-            self.game.draw_text('Options', 20, self.game.display_w/2, self.game.display_h/2 - 30)
-            self.game.draw_text('Volume', 15, self.volx, self.voly)
-            self.game.draw_text('Controls', 15, self.controlsx, self.controlsy)
-            self.draw_cursor()
-            self.blit_screen()
+    def draw_static(self):
+        self.game.draw_text('Options', 20, self.game.display_w/2, self.game.display_h/2 - 30)
+        self.game.draw_text('Volume', 15, self.volx, self.voly)
+        self.game.draw_text('Controls', 15, self.controlsx, self.controlsy)
+        self.draw_cursor()
 
     def check_input(self):
         if self.game.BACK_KEY:
@@ -159,16 +369,13 @@ class VolumeMenu(Menu):
     def __init__(self, game):
         Menu.__init__(self, game)
 
-    def display_menu(self):
-        self.run_display = True
-        while self.run_display:
-            self.game.check_events()
-            self.check_input()
-            self.game.display.fill(self.game.black)
-            self.game.draw_text('Volume', 20, self.game.display_w/2, self.game.display_h/2 - 30)
-            volume_text = f'{self.game.volume} / 10'
-            self.game.draw_text(volume_text, 20, self.game.display_w/2, self.game.display_h/2 + 10)
-            self.blit_screen()
+    def view_key(self):
+        return self.game.volume
+
+    def draw_static(self):
+        self.game.draw_text('Volume', 20, self.game.display_w/2, self.game.display_h/2 - 30)
+        volume_text = f'{self.game.volume} / 10'
+        self.game.draw_text(volume_text, 20, self.game.display_w/2, self.game.display_h/2 + 10)
         
     def check_input(self):
         if self.game.LEFT_KEY and self.game.volume > 0:
@@ -201,29 +408,21 @@ class ControlsMenu(Menu):
         self.mouse_click = pygame.transform.scale(pygame.image.load('Assets\img\controls\LeftClick-Blue.png').convert_alpha(), (96, 96))
         self.mouse_look = pygame.transform.scale(pygame.image.load('Assets\img\controls\MoveDiagonal.png').convert_alpha(), (96, 96))
 
-    def display_menu(self):
-        self.run_display = True
-        while self.run_display:
-            self.game.check_events()
-            self.check_input()
-            self.game.display.fill(self.game.black)
-
-            self.keyx, self.keyy = self.mid_w/2, self.mid_h/2
-            self.game.display.blit(self.key_z, (self.keyx, self.keyy - 70))
-            self.game.display.blit(self.key_q, (self.keyx - 64, self.keyy -6))
-            self.game.display.blit(self.key_s, (self.keyx, self.keyy -6))
-            self.game.display.blit(self.key_d, (self.keyx + 64, self.keyy -6))
-            self.game.draw_text('Move', 22, self.keyx + 500, self.keyy + 15)
-            self.game.display.blit(self.arrow_right, (self.keyx + 250, self.keyy - 25))
-
-            self.game.display.blit(self.mouse_click, (self.keyx - 16, self.keyy + 125))
-            self.game.draw_text('Attack', 22, self.keyx + 500, self.keyy + 170)
-            self.game.display.blit(self.mouse_look, (self.keyx - 16, self.keyy + 280))
-            self.game.draw_text('Aim', 22, self.keyx + 500, self.keyy + 325)
-            self.game.display.blit(self.arrow_right, (self.keyx + 250, self.keyy + 130))
-            self.game.display.blit(self.arrow_right, (self.keyx + 250, self.keyy + 285))
-
-            self.blit_screen()
+    def draw_static(self):
+        self.keyx, self.keyy = self.mid_w/2, self.mid_h/2
+        self.game.display.blit(self.key_z, (self.keyx, self.keyy - 70))
+        self.game.display.blit(self.key_q, (self.keyx - 64, self.keyy -6))
+        self.game.display.blit(self.key_s, (self.keyx, self.keyy -6))
+        self.game.display.blit(self.key_d, (self.keyx + 64, self.keyy -6))
+        self.game.draw_text('Move', 22, self.keyx + 500, self.keyy + 15)
+        self.game.display.blit(self.arrow_right, (self.keyx + 250, self.keyy - 25))
+
+        self.game.display.blit(self.mouse_click, (self.keyx - 16, self.keyy + 125))
+        self.game.draw_text('Attack', 22, self.keyx + 500, self.keyy + 170)
+        self.game.display.blit(self.mouse_look, (self.keyx - 16, self.keyy + 280))
+        self.game.draw_text('Aim', 22, self.keyx + 500, self.keyy + 325)
+        self.game.display.blit(self.arrow_right, (self.keyx + 250, self.keyy + 130))
+        self.game.display.blit(self.arrow_right, (self.keyx + 250, self.keyy + 285))
 
     def check_input(self):
         if self.game.BACK_KEY:
@@ -235,25 +434,24 @@ class CreditsMenu(Menu):
     def __init__(self, game):
         Menu.__init__(self, game)
 
-    def display_menu(self):
-        self.run_display = True
-        while self.run_display:
-            self.game.check_events()
-            if self.game.BACK_KEY:
-                self.game.goback_sound.play()
-                self.game.current_menu = self.game.main_menu
-                self.run_display = False
-            self.game.display.fill(self.game.black)
-            self.game.draw_text('Credits', 20, self.game.display_w/2, self.game.display_h/2 - 20)
-            self.game.draw_text('Made by Dungeon and Doofuses', 15, self.game.display_w/2, self.game.display_h/2 + 20)
-            self.game.draw_text('bas vannieuwenborgh', 15, self.game.display_w/2, self.game.display_h/2 + 40)
-            self.game.draw_text('Rik Indigne', 15, self.game.display_w/2, self.game.display_h/2 + 60)
-            self.game.draw_text('Viktor Heijlen', 15, self.game.display_w/2, self.game.display_h/2 + 80)
-            self.game.draw_text('zeeshan Mahar', 15, self.game.display_w/2, self.game.display_h/2 + 100)
-            self.game.draw_text('Thian Penen', 15, self.game.display_w/2, self.game.display_h/2 + 120)
-            self.blit_screen()
+    def check_input(self):
+        if self.game.BACK_KEY:
+            self.game.goback_sound.play()
+            self.game.current_menu = self.game.main_menu
+            self.run_display = False
+
+    def draw_static(self):
+        self.game.draw_text('Credits', 20, self.game.display_w/2, self.game.display_h/2 - 20)
+        self.game.draw_text('Made by Dungeon and Doofuses', 15, self.game.display_w/2, self.game.display_h/2 + 20)
+        self.game.draw_text('bas vannieuwenborgh', 15, self.game.display_w/2, self.game.display_h/2 + 40)
+        self.game.draw_text('Rik Indigne', 15, self.game.display_w/2, self.game.display_h/2 + 60)
+        self.game.draw_text('Viktor Heijlen', 15, self.game.display_w/2, self.game.display_h/2 + 80)
+        self.game.draw_text('zeeshan Mahar', 15, self.game.display_w/2, self.game.display_h/2 + 100)
+        self.game.draw_text('Thian Penen', 15, self.game.display_w/2, self.game.display_h/2 + 120)
 
 class GameOverMenu(Menu):
+    title = "GAME OVER"
+
     def __init__(self, game):
         super().__init__(game)
 
@@ -270,30 +468,23 @@ class GameOverMenu(Menu):
         # cursor
         self.cursor_offset_x = -30
 
-    def display_menu(self):
-        self.run_display = True
-
+    def open(self):
         # SAFE cursor initialization (yesx exists here)
         self.cursor_rectangle.midtop = (
             self.yesx + self.cursor_offset_x,
             self.yesy
         )
 
-        while self.run_display:
-            self.game.check_events()
-            self.check_input()
-            self.game.display.fill(self.game.black)
-
-            title_y = self.mid_h - 80
-            subtitle_y = self.mid_h - 40
+    def draw_static(self):
+        title_y = self.mid_h - 80
+        subtitle_y = self.mid_h - 40
 
-            self.game.draw_text("GAME OVER", 32, self.mid_w, title_y)
-            self.game.draw_text("Play Again", 20, self.mid_w, subtitle_y)
-            self.game.draw_text("Yes", 20, self.yesx, self.button_y)
-            self.game.draw_text("No", 20, self.nox, self.button_y)
+        self.game.draw_text(self.title, 32, self.mid_w, title_y)
+        self.game.draw_text("Play Again", 20, self.mid_w, subtitle_y)
+        self.game.draw_text("Yes", 20, self.yesx, self.button_y)
+        self.game.draw_text("No", 20, self.nox, self.button_y)
 
-            self.draw_cursor()
-            self.blit_screen()
+        self.draw_cursor()
 
     def check_input(self):
         if self.game.LEFT_KEY or self.game.RIGHT_KEY:
@@ -320,30 +511,9 @@ class GameOverMenu(Menu):
 
 
 class VictoryMenu(GameOverMenu):
-    def display_menu(self):
-        self.run_display = True
-
-        # cursor starts on "Yes"
-        self.cursor_rectangle.midtop = (
-            self.yesx + self.cursor_offset_x,
-            self.yesy
-        )
-
-        while self.run_display:
-            self.game.check_events()
-            self.check_input()
-            self.game.display.fill(self.game.black)
-
-            title_y = self.mid_h - 80
-            subtitle_y = self.mid_h - 40
-
-            self.game.draw_text("VICTORY", 32, self.mid_w, title_y)
-            self.game.draw_text("Play Again", 20, self.mid_w, subtitle_y)
-            self.game.draw_text("Yes", 20, self.yesx, self.button_y)
-            self.game.draw_text("No", 20, self.nox, self.button_y)
+    # same screen and input as game over, cursor starts on "Yes" too
+    title = "VICTORY"
 
-            self.draw_cursor()
-            self.blit_screen()
 # class PauseMenu(Menu):
 #     def __init__(self, game):
 #         Menu.__init__(self, game)
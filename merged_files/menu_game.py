@@ -63,8 +63,9 @@ class Game():
     #     self.playing = False
     #     self.current_menu = self.game_over_menu
 
-    def check_events(self):
-        for event in pygame.event.get():
+    def check_events(self, events=None):
+        # events: already taken from the queue (Menu.wait), else whatever is queued
+        for event in events if events is not None else pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running, self.playing = False, False
                 self.current_menu.run_display = False
@@ -91,9 +92,8 @@ class Game():
         self.ESCAPE_KEY = False
 
     def draw_text(self, text, size, x, y):
-        pygame.init()
-        font = pygame.font.Font(self.font_name,size)
-        text_surface = font.render(text, True, self.white)
+        # fonts and rendered strings are cached, only new text gets rendered
+        text_surface = gameplay.text_cache.render(text, size, self.white, self.font_name)
         text_rectangle = text_surface.get_rect()
         text_rectangle.center = (x,y)
         self.display.blit(text_surface,text_rectangle)
@@ -1,38 +1,193 @@
 import pygame
+import threading
+from collections import OrderedDict
 
 pygame.mixer.init()
 
-sfx_combat_start = pygame.mixer.Sound('sounds\combat_start.ogg')
+SOUND_BUDGET = 2 * 1024 * 1024  # decoded PCM kept in memory, least recently played goes first
+VOICE_CHANNELS = 8              # mixer channels reserved for effects, Sound.play() (menus) gets the rest
+PRIORITY_LOW, PRIORITY_NORMAL, PRIORITY_HIGH = 0, 1, 2
+# per category: (voices at once, steal the oldest when full); a full category
+# that doesn't steal drops the request, like the old get_busy() checks did
+VOICE_LIMITS = {
+    'footsteps': (1, False),
+    'sword': (2, True),
+    'hits': (3, True),
+    'damage': (1, True),
+}
+DEFAULT_VOICE_LIMIT = (2, True)
 
-sfx_deur = pygame.mixer.Sound('sounds\deur.ogg')
+class SoundBank:
+    """Sound effects by name, decoded on first use instead of at import.
+    Decoded sounds count against `budget` bytes; past it the least recently
+    used ones that aren't playing are dropped and decoded again when needed.
+    warm_up() decodes ahead of time in a background thread."""
+    def __init__(self, budget=SOUND_BUDGET):
+        self.budget = budget
+        self.entries = {}             # name -> (path, volume, category)
+        self.sounds = OrderedDict()   # name -> (Sound, bytes), most recently used last
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.decodes = self.hits = self.evictions = 0
 
-sfx_minotaurus = pygame.mixer.Sound('sounds\minotaurus.ogg')
-sfx_minotaurus.set_volume(.75)
+    def register(self, name, path, volume=1.0, category=None):
+        self.entries[name] = (path, volume, category or name)
 
-sfx_pijl = pygame.mixer.Sound('sounds\pijl.ogg')
+    def category(self, name):
+        return self.entries[name][2]
 
-sfx_sfeergeluid = pygame.mixer.Sound('sounds\sfeergeluid1.ogg')
+    def sound_bytes(self, sound):
+        freq, size, channels = pygame.mixer.get_init()
+        return round(sound.get_length() * freq) * channels * (abs(size) // 8)
 
-sfx_sleutel = pygame.mixer.Sound('sounds\sleutel_in_slot.ogg')
+    def get(self, name):
+        with self.lock:
+            if name in self.sounds:
+                self.sounds.move_to_end(name)
+                self.hits += 1
+                return self.sounds[name][0]
+        # decode outside the lock so a warm-up thread doesn't stall the game loop
+        path, volume, _ = self.entries[name]
+        sound = pygame.mixer.Sound(path)
+        sound.set_volume(volume)
+        with self.lock:
+            if name in self.sounds:  # decoded by the other thread meanwhile
+                return self.sounds[name][0]
+            size = self.sound_bytes(sound)
+            self.sounds[name] = (sound, size)
+            self.bytes += size
+            self.decodes += 1
+            self.evict(keep=name)
+        return sound
 
-sfx_slime_dood = pygame.mixer.Sound('sounds\slime_dood.ogg')
+    def evict(self, keep=None):
+        for name in list(self.sounds):
+            if self.bytes <= self.budget:
+                break
+            sound, size = self.sounds[name]
+            if name == keep or sound.get_num_channels():
+                continue  # still playing, dropping it would cut it off
+            del self.sounds[name]
+            self.bytes -= size
+            self.evictions += 1
 
-sfx_slime_springt = pygame.mixer.Sound('sounds\slime_springt.ogg')
+    def play(self, name, loops=0):
+        return self.get(name).play(loops)
 
-sfx_voetstappen = pygame.mixer.Sound('sounds\stappen.ogg')
+    def warm_up(self, names=None, background=True):
+        names = list(self.entries if names is None else names)
+        if not background:
+            for name in names:
+                self.get(name)
+            return None
+        thread = threading.Thread(target=self.warm_up, args=(names, False), daemon=True)
+        thread.start()
+        return thread
 
-sfx_zwaard = pygame.mixer.Sound('sounds\zwaard1.ogg')
-sfx_zwaard.set_volume(.1)
+    def stats(self):
+        return {'loaded': len(self.sounds), 'bytes': self.bytes, 'budget': self.budget,
+                'decodes': self.decodes, 'hits': self.hits, 'evictions': self.evictions}
 
-sfx_punch = pygame.mixer.Sound('sounds\punch.ogg')
-sfx_punch.set_volume(.1)
+class VoicePool:
+    """Plays bank sounds on a fixed set of reserved channels.
+    play() picks a free channel unless the sound's category is at its
+    VOICE_LIMITS count; when a voice has to give way it is the oldest one of
+    the same category, or, with every channel busy, the oldest of the lowest
+    priority playing, never one above the requested priority."""
+    def __init__(self, bank, channels=VOICE_CHANNELS, limits=VOICE_LIMITS):
+        self.bank = bank
+        self.limits = limits
+        if pygame.mixer.get_num_channels() < channels + 4:
+            pygame.mixer.set_num_channels(channels + 4)
+        pygame.mixer.set_reserved(channels)  # Sound.play() won't pick these
+        self.channels = [pygame.mixer.Channel(i) for i in range(channels)]
+        self.voices = [None] * channels  # per channel: (serial, priority, category, name)
+        self.serial = 0
+        self.played = self.dropped = self.stolen = 0
+        self.dropped_by_category = {}
 
-sfx_damage = pygame.mixer.Sound('sounds\damage.ogg')
-sfx_damage.set_volume(.2)
+    def active(self):
+        # forget voices whose channel finished
+        for i, voice in enumerate(self.voices):
+            if voice is not None and not self.channels[i].get_busy():
+                self.voices[i] = None
+        return [i for i, voice in enumerate(self.voices) if voice is not None]
 
-channel0 = pygame.mixer.Channel(0)
-channel1 = pygame.mixer.Channel(1)
-channel2 = pygame.mixer.Channel(2)
-channel3 = pygame.mixer.Channel(3)
-channel4 = pygame.mixer.Channel(4)
-channel5 = pygame.mixer.Channel(5)
\ No newline at end of file
+    def pick(self, candidates, priority):
+        # lowest priority first, then oldest; None if all outrank the request
+        candidates = [i for i in candidates if self.voices[i][1] <= priority]
+        return min(candidates, key=lambda i: (self.voices[i][1], self.voices[i][0]), default=None)
+
+    def play(self, name, priority=PRIORITY_NORMAL, loops=0):
+        category = self.bank.category(name)
+        limit, steal = self.limits.get(category, DEFAULT_VOICE_LIMIT)
+        playing = self.active()
+        same = [i for i in playing if self.voices[i][2] == category]
+        if len(same) >= limit:
+            index = self.pick(same, priority) if steal else None
+        elif len(playing) < len(self.channels):
+            index = self.voices.index(None)
+        else:
+            index = self.pick(playing, priority)
+        if index is None:
+            self.dropped += 1
+            self.dropped_by_category[category] = self.dropped_by_category.get(category, 0) + 1
+            return None
+        channel = self.channels[index]
+        if self.voices[index] is not None:
+            self.stolen += 1
+            channel.stop()
+        self.serial += 1
+        self.voices[index] = (self.serial, priority, category, name)
+        channel.play(self.bank.get(name), loops)
+        self.played += 1
+        return channel
+
+    def playing(self, category=None):
+        return sum(1 for i in self.active() if category is None or self.voices[i][2] == category)
+
+    def stop(self):
+        for channel in self.channels:
+            channel.stop()
+        self.voices = [None] * len(self.channels)
+
+    def stats(self):
+        return {'played': self.played, 'dropped': self.dropped, 'stolen': self.stolen,
+                'dropped_by_category': dict(self.dropped_by_category)}
+
+sound_bank = SoundBank()
+
+sound_bank.register('combat_start', 'sounds\combat_start.ogg')
+
+sound_bank.register('deur', 'sounds\deur.ogg')
+
+sound_bank.register('minotaurus', 'sounds\minotaurus.ogg', .75)
+
+sound_bank.register('pijl', 'sounds\pijl.ogg')
+
+sound_bank.register('sfeergeluid', 'sounds\sfeergeluid1.ogg')
+
+sound_bank.register('sleutel', 'sounds\sleutel_in_slot.ogg')
+
+sound_bank.register('slime_dood', 'sounds\slime_dood.ogg')
+
+sound_bank.register('slime_springt', 'sounds\slime_springt.ogg')
+
+sound_bank.register('voetstappen', 'sounds\stappen.ogg', category='footsteps')
+
+sound_bank.register('zwaard', 'sounds\zwaard1.ogg', .1, 'sword')
+
+sound_bank.register('punch', 'sounds\punch.ogg', .1, 'hits')
+
+sound_bank.register('damage', 'sounds\damage.ogg', .2)
+
+# the gameplay sounds, decoded in the background when a run starts
+GAMEPLAY_SOUNDS = ('zwaard', 'voetstappen', 'punch', 'damage')
+
+def __getattr__(name):
+    # old module-level names (sfx_zwaard, ...) still work, decoding on first access
+    if name.startswith('sfx_') and name[4:] in sound_bank.entries:
+        return sound_bank.get(name[4:])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+voices = VoicePool(sound_bank)